@@ -1,11 +1,14 @@
-from flask import Flask, render_template, redirect, url_for, request, session, flash, jsonify, send_file
-from firebase_admin import auth, initialize_app, credentials
+import time
+_import_started = time.perf_counter()
+
+from flask import Flask, render_template, redirect, url_for, request, session, flash, jsonify, send_file, Response, stream_with_context, g
 import os
 import logging
-from werkzeug.utils import secure_filename
 import io
 import json 
-from weasyprint import HTML 
+import hashlib
+import threading
+import multiprocessing
 from flask_session import Session
 
 # Configure logging for app.py
@@ -14,19 +17,51 @@ logger = logging.getLogger(__name__)
 
 # Import custom modules
 # Adjust import paths based on your actual project structure if different
-from resume_scraper.resume_parser import parse_resume_from_file, generate_resume_summary, infer_career_interests
-from models.job_matcher import ResumeJobMatcher
-from utils.helpers import allowed_file, fetch_jobs_from_db
+from resume_scraper.resume_parser import parse_resume_from_file, generate_resume_summary, infer_career_interests, read_upload, check_upload, SUMMARY_FALLBACK
+from utils.helpers import allowed_file
+from utils.cache import get_resume_cache, upload_digest
+from utils.metrics import METRICS_CONTENT_TYPE, render_metrics, timed_stage, track_request
+from utils.llm_clients import warm_up_clients_in_background
+from utils.job_queue import JobQueueFull, get_job_queue
+from utils.results_store import get_results_store
+from utils.pdf_renderer import get_pdf_renderer, pdf_cache_key
+from utils.job_catalog import get_catalog_jobs
+from models.resume_features import resume_fingerprint
 from config import Config # Assuming Config is in config.py in the same directory or accessible via PYTHONPATH
 
-# Initialize Firebase (assuming your credentials file is correctly placed)
-try:
-    cred = credentials.Certificate("cvisionary-d034a-firebase-adminsdk-fbsvc-dca53ec298.json")
-    firebase_app = initialize_app(cred)
-    logger.info("Firebase initialized successfully.")
-except Exception as e:
-    logger.error(f"Error initializing Firebase: {e}")
-    firebase_app = None # Ensure firebase_app is None if initialization fails
+# Heavy clients (Firebase Admin, the Gemini-backed matcher, WeasyPrint) are created on
+# first use rather than at import, so gunicorn workers boot quickly
+_lazy_lock = threading.Lock()
+_firebase_app = None
+_firebase_initialized = False
+_matcher = None
+
+def get_firebase_app():
+    """Firebase Admin app, initialized on first use (None if the credentials are unavailable)"""
+    global _firebase_app, _firebase_initialized
+    with _lazy_lock:
+        if not _firebase_initialized:
+            _firebase_initialized = True
+            # Initialize Firebase (assuming your credentials file is correctly placed)
+            try:
+                from firebase_admin import initialize_app, credentials
+                cred = credentials.Certificate("cvisionary-d034a-firebase-adminsdk-fbsvc-dca53ec298.json")
+                _firebase_app = initialize_app(cred)
+                logger.info("Firebase initialized successfully.")
+            except Exception as e:
+                logger.error(f"Error initializing Firebase: {e}")
+                _firebase_app = None # Ensure firebase_app is None if initialization fails
+        return _firebase_app
+
+def get_matcher():
+    """Shared ResumeJobMatcher, created by the first request that needs it"""
+    global _matcher
+    if _matcher is None:
+        with _lazy_lock:
+            if _matcher is None:
+                from models.job_matcher import ResumeJobMatcher
+                _matcher = ResumeJobMatcher()
+    return _matcher
 
 app = Flask(__name__)
 app.secret_key = 'your_super_secret_key_here' # **IMPORTANT**: Change this to a strong, random key in production!
@@ -35,9 +70,6 @@ app.secret_key = 'your_super_secret_key_here' # **IMPORTANT**: Change this to a
 app.config['UPLOAD_FOLDER'] = Config.UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = Config.MAX_CONTENT_LENGTH
 
-# Initialize ResumeJobMatcher globally (or per request, but globally is fine for now)
-matcher = ResumeJobMatcher()
-
 # Ensure the upload folder exists on startup
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
@@ -45,6 +77,80 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 app.config['SESSION_TYPE'] = 'filesystem'
 Session(app)
 
+SSE_KEEPALIVE_SECONDS = 15  # comment lines sent while a queued job has no news, so proxies keep the stream open
+# Result fields that older versions kept in the session itself
+LEGACY_SESSION_KEYS = ('parsed_resume_data', 'resume_summary', 'scraped_matched_jobs', 'llm_recommended_jobs', 'streamed_result_id')
+
+def run_resume_pipeline(file_obj):
+    """
+    Runs the upload pipeline (parse, summary, recommendations, job matching) and
+    yields (event, data) tuples as each stage finishes. Ranked jobs are yielded
+    one "job" event at a time, in the order they finish scoring.
+    """
+    file_bytes = read_upload(file_obj)
+    # Repeat uploads of the same file reuse the parsed resume, summary and keywords
+    resume_cache = get_resume_cache()
+    upload_hash = upload_digest(file_bytes)
+    cached = resume_cache.get(upload_hash) if resume_cache else {}
+
+    parsed_resume_data = cached.get('parsed')
+    if parsed_resume_data:
+        logger.info(f"Parsed resume cache hit for upload {upload_hash[:12]}")
+    else:
+        parsed_resume_data = parse_resume_from_file(file_bytes)
+        if not parsed_resume_data or 'error' in parsed_resume_data:
+            error_msg = parsed_resume_data.get('error', 'Unknown error parsing resume') if parsed_resume_data else 'No resume data parsed'
+            logger.error(f"Resume parsing error: {error_msg}")
+            yield 'error', {"error": error_msg}
+            return
+        if resume_cache:
+            resume_cache.update(upload_hash, parsed=parsed_resume_data)
+    yield 'parsed', parsed_resume_data
+
+    # Generate resume summary
+    resume_summary = cached.get('summary')
+    if not resume_summary:
+        with timed_stage('summary'):
+            resume_summary = generate_resume_summary(parsed_resume_data)
+        if not resume_summary:
+            logger.warning("Failed to generate resume summary.")
+        elif resume_cache and resume_summary != SUMMARY_FALLBACK:
+            resume_cache.update(upload_hash, summary=resume_summary)
+    yield 'summary', resume_summary
+
+    # Extract keywords and other per-resume features once for both recommendation and matching
+    matcher = get_matcher()
+    with timed_stage('keywords'):
+        resume_features = matcher.build_resume_features(parsed_resume_data, keywords=cached.get('keywords'))
+    if resume_cache and resume_features.keywords and 'keywords' not in cached:
+        resume_cache.update(upload_hash, keywords=resume_features.keywords)
+
+    # Generate LLM-powered Job Recommendations (using the job_matcher instance)
+    with timed_stage('recommendations'):
+        llm_recommended_jobs = matcher.generate_job_recommendations(parsed_resume_data, features=resume_features)
+    if not llm_recommended_jobs:
+        logger.info('No suitable job recommendations found from AI.')
+    yield 'recommendations', llm_recommended_jobs
+
+    # Match against scraped jobs, served from the in-memory job catalog
+    with timed_stage('db_fetch'):
+        job_listings = get_catalog_jobs()
+    if job_listings:
+        with timed_stage('ranking'):
+            for matched_job in matcher.iter_match_resume_to_jobs(
+                parsed_resume_data, resume_summary, job_listings, features=resume_features
+            ):
+                yield 'job', matched_job
+    else:
+        logger.warning("No job listings found in DB for traditional matching.")
+
+def sort_by_match_score(matched_jobs):
+    return sorted(matched_jobs, key=lambda x: x.get('match_details', {}).get('match_score', 0), reverse=True)
+
+def sse_event(event, data):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
 # --- Existing Routes ---
 @app.route('/')
 def home():
@@ -96,92 +202,162 @@ def activity2():
 def upload_page():
     return render_template('upload.html')
 
-# --- New /process-resume route for POST requests (handles upload & AI processing) ---
+def run_upload_job(job, file_bytes, redirect_url):
+    """Queue worker: run the pipeline for one upload, publish its events and save the results under the job id"""
+    results = {'scraped_matched_jobs': []}
+    with track_request('process_resume'):
+        for event, data in run_resume_pipeline(file_bytes):
+            if event == 'error':
+                job.fail(data.get('error', 'Unknown error parsing resume'))
+                return
+            if event == 'job':
+                results['scraped_matched_jobs'].append(data)
+            else:
+                results[event] = data
+            job.publish(event, data)
+
+    stored = {
+        'parsed_resume_data': results['parsed'],
+        'resume_summary': results['summary'],
+        'scraped_matched_jobs': sort_by_match_score(results['scraped_matched_jobs']),
+        'llm_recommended_jobs': results['recommendations']
+    }
+    if not stored['scraped_matched_jobs']:
+        logger.info('No suitable job matches found from scraped jobs.')
+    get_results_store().save(job.id, stored)
+    if Config.PDF_PRERENDER:
+        prerender_resume_pdf(stored['parsed_resume_data'])
+    logger.info(f"Resume processed successfully for job {job.id}.")
+    job.finish({"redirect": redirect_url})
+
+PDF_TEMPLATE = 'resume_pdf_template.html'
+_pdf_template_version = None
+
+def pdf_template_version():
+    """Hash of the PDF template's source, so cached PDFs are not reused after it changes"""
+    global _pdf_template_version
+    if _pdf_template_version is None:
+        source = app.jinja_env.loader.get_source(app.jinja_env, PDF_TEMPLATE)[0]
+        _pdf_template_version = hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]
+    return _pdf_template_version
+
+def resume_pdf_key(parsed_resume_data):
+    return pdf_cache_key(resume_fingerprint(parsed_resume_data), pdf_template_version())
+
+def render_resume_pdf_html(parsed_resume_data):
+    # Render the HTML template specifically for PDF conversion; an app context is enough, so queue workers can call this too
+    with app.app_context():
+        return render_template(PDF_TEMPLATE, resume_data=parsed_resume_data)
+
+def prerender_resume_pdf(parsed_resume_data):
+    """Start rendering the parsed resume PDF in the background so the first download is instant"""
+    try:
+        get_pdf_renderer().prerender(resume_pdf_key(parsed_resume_data),
+                                     lambda: render_resume_pdf_html(parsed_resume_data))
+    except Exception as e:
+        logger.warning(f"Could not pre-render the parsed resume PDF: {e}")
+
+def submit_upload():
+    """
+    Validate the uploaded CV and queue it for processing. Returns (job, None), or
+    (None, error response) for a bad upload or a full queue. The job id doubles as
+    the result id; it is all the session holds, /results loads the rest from the store.
+    """
+    file = request.files.get('cv-file')
+    if not file or file.filename == '':
+        logger.warning("No selected file.")
+        return None, (jsonify({"error": "No selected file"}), 400)
+    if not allowed_file(file.filename):
+        logger.warning(f"Disallowed file type uploaded for {file.filename}")
+        return None, (jsonify({"error": "Invalid file type. Supported formats: PDF, DOCX, DOC, RTF"}), 400)
+
+    # Read the upload now (bounded by MAX_CONTENT_LENGTH); the request body is gone once the response starts
+    file_bytes = file.read()
+    upload_error = check_upload(file_bytes)
+    if upload_error:
+        logger.warning(f"Rejected upload {file.filename}: {upload_error}")
+        return None, (jsonify({"error": upload_error}), 400)
+    redirect_url = url_for('show_results')
+    try:
+        job = get_job_queue().submit(lambda job: run_upload_job(job, file_bytes, redirect_url))
+    except JobQueueFull as e:
+        logger.warning(f"Rejected upload: {e}")
+        return None, (jsonify({"error": "The server is busy processing other resumes. Please try again shortly."}),
+                      503, {'Retry-After': '30'})
+
+    session['result_id'] = job.id
+    for key in LEGACY_SESSION_KEYS:
+        session.pop(key, None)
+    logger.info(f"Queued resume processing job {job.id}")
+    return job, None
+
+# --- /process-resume queues the upload and answers 202 with a job id to poll ---
 @app.route('/process-resume', methods=['POST'])
 def process_resume():
     logger.info("Received request to /process-resume")
+    job, error_response = submit_upload()
+    if error_response:
+        return error_response
+    status_url = url_for('process_resume_status', job_id=job.id)
+    return jsonify({
+        "message": "Resume accepted for processing.",
+        "job_id": job.id,
+        "status_url": status_url,
+        "redirect": url_for('show_results')
+    }), 202, {'Location': status_url}
+
+# --- Progress and, once done, the results of a queued upload ---
+@app.route('/process-resume/<job_id>', methods=['GET'])
+def process_resume_status(job_id):
+    status = get_job_queue().status(job_id)
+    if status is None:
+        return jsonify({"error": "Unknown or expired job id"}), 404
+    if status['state'] == 'done':
+        status['result'] = get_results_store().load(job_id)
+    return jsonify(status), 200
+
+# --- Streaming variant of /process-resume: server-sent events per stage and per ranked job ---
+@app.route('/process-resume/stream', methods=['POST'])
+def process_resume_stream():
+    logger.info("Received request to /process-resume/stream")
+    job, error_response = submit_upload()
+    if error_response:
+        return error_response
+
+    def generate():
+        # Relay the queued job's events; the pipeline itself runs on the queue's workers
+        cursor = 0
+        while True:
+            events = job.wait_events(cursor, timeout=SSE_KEEPALIVE_SECONDS)
+            if not events:
+                yield ": keep-alive\n\n"
+                continue
+            cursor += len(events)
+            for event, data in events:
+                yield sse_event(event, data)
+                if event in ('done', 'error'):
+                    return
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
-    if 'cv-file' not in request.files:
-        logger.warning("No file part in the request.")
-        return jsonify({"error": "No file part"}), 400
-
-    file = request.files['cv-file']
-
-    if file.filename == '':
-        logger.warning("No selected file.")
-        return jsonify({"error": "No selected file"}), 400
-
-    if file and allowed_file(file.filename):
-        filename_secured = secure_filename(file.filename)
-        # Create a temporary file path for processing
-        filepath_temp = os.path.join(app.config['UPLOAD_FOLDER'], filename_secured)
-        
-        try:
-            # Save the file temporarily
-            file.save(filepath_temp)
-            logger.info(f"Temporarily saved file: {filepath_temp}")
-
-            # Open the saved file for parsing
-            with open(filepath_temp, 'rb') as temp_file_obj:
-                parsed_resume_data = parse_resume_from_file(temp_file_obj)
-
-            if not parsed_resume_data or 'error' in parsed_resume_data:
-                error_msg = parsed_resume_data.get('error', 'Unknown error parsing resume') if parsed_resume_data else 'No resume data parsed'
-                logger.error(f"Resume parsing error: {error_msg}")
-                return jsonify({"error": error_msg}), 500
-
-            # Generate resume summary
-            resume_summary = generate_resume_summary(parsed_resume_data)
-            if not resume_summary:
-                logger.warning("Failed to generate resume summary.")
-
-            # Generate LLM-powered Job Recommendations (using the job_matcher instance)
-            llm_recommended_jobs = matcher.generate_job_recommendations(parsed_resume_data)
-            if not llm_recommended_jobs:
-                logger.info('No suitable job recommendations found from AI.')
-
-            # Fetch and Match against scraped jobs (if you want both types of recommendations)
-            # You might want to run scrape_job_listings less frequently (e.g., as a scheduled task)
-            # rather than on every resume upload for performance.
-            job_listings = fetch_jobs_from_db()
-            scraped_matched_jobs = []
-            if job_listings:
-                scraped_matched_jobs = matcher.match_resume_to_jobs(
-                    parsed_resume_data, resume_summary, job_listings
-                )
-                if not scraped_matched_jobs:
-                    logger.info('No suitable job matches found from scraped jobs.')
-            else:
-                logger.warning("No job listings found in DB for traditional matching.")
-
-            # Store all processed data in session
-            session['parsed_resume_data'] = parsed_resume_data
-            session['resume_summary'] = resume_summary
-            session['scraped_matched_jobs'] = scraped_matched_jobs
-            session['llm_recommended_jobs'] = llm_recommended_jobs
-
-            logger.info("Resume processed successfully. Data stored in session.")
-            flash('Resume uploaded and processed successfully!', 'success')
-            return jsonify({"message": "Resume processed successfully!", "redirect": url_for('show_results')}), 200
-
-        except Exception as e:
-            logger.exception("An unhandled error occurred during resume processing.")
-            return jsonify({"error": f"An unexpected error occurred: {str(e)}."}), 500
-        finally:
-            if os.path.exists(filepath_temp):
-                os.remove(filepath_temp)  # Clean up the temporary uploaded file
-                logger.info(f"Cleaned up temporary uploaded file: {filepath_temp}")
-    else:
-        logger.warning(f"Disallowed file type uploaded for {file.filename}")
-        return jsonify({"error": "Invalid file type. Supported formats: PDF, DOCX, DOC, RTF"}), 400
+def get_result_data(key, default=None):
+    """A field of this session's latest upload results, loaded from the results store once per request"""
+    if 'upload_results' not in g:
+        result_id = session.get('result_id')
+        g.upload_results = (get_results_store().load(result_id) if result_id else None) or {}
+    return g.upload_results.get(key, default)
 
 # --- New Route for displaying results ---
 @app.route('/results', methods=['GET'])
 def show_results():
-    parsed_resume_data = session.get('parsed_resume_data')
-    resume_summary = session.get('resume_summary')
-    scraped_matched_jobs = session.get('scraped_matched_jobs', [])
-    llm_recommended_jobs = session.get('llm_recommended_jobs', [])
+    parsed_resume_data = get_result_data('parsed_resume_data')
+    resume_summary = get_result_data('resume_summary')
+    scraped_matched_jobs = get_result_data('scraped_matched_jobs', [])
+    llm_recommended_jobs = get_result_data('llm_recommended_jobs', [])
 
     if not parsed_resume_data:
         flash('No resume data found. Please upload a resume first.', 'warning')
@@ -195,23 +371,19 @@ def show_results():
         llm_recommended_jobs=llm_recommended_jobs
     )
 
-# --- Modified Download Routes (fetching data from session) ---
+# --- Download routes (loading the results from the results store) ---
 @app.route('/download_parsed_resume_pdf')
 def download_parsed_resume_pdf():
-    parsed_resume_data = session.get('parsed_resume_data')
+    parsed_resume_data = get_result_data('parsed_resume_data')
     if not parsed_resume_data:
         flash('No parsed resume data available for download. Please upload a resume first.', 'error')
         return redirect(url_for('upload_page'))
 
-    # Render the HTML template specifically for PDF conversion
-    # Ensure this template is in your 'templates' folder
-    rendered_html = render_template('resume_pdf_template.html', resume_data=parsed_resume_data)
-
-    # Convert HTML to PDF using WeasyPrint
-    pdf_bytes = io.BytesIO()
+    # Convert HTML to PDF using WeasyPrint, in the render service's worker processes (or from its cache)
     try:
-        HTML(string=rendered_html).write_pdf(pdf_bytes)
-        pdf_bytes.seek(0) # Rewind the BytesIO object to the beginning
+        pdf_bytes = io.BytesIO(get_pdf_renderer().render(
+            resume_pdf_key(parsed_resume_data), lambda: render_resume_pdf_html(parsed_resume_data)
+        ))
 
         full_name = parsed_resume_data.get('Full Name', 'Parsed_Resume').replace(' ', '_')
         download_filename = f"{full_name}_CVisionary.pdf"
@@ -222,6 +394,11 @@ def download_parsed_resume_pdf():
             as_attachment=True,
             download_name=download_filename
         )
+    except TimeoutError:
+        # The render keeps going in the background and lands in the cache for the next click
+        logger.warning(f"PDF render exceeded {get_pdf_renderer().timeout:g}s")
+        flash('Your PDF is taking longer than usual to generate. Please try again in a moment.', 'warning')
+        return redirect(url_for('show_results'))
     except Exception as e:
         logger.exception("Error generating PDF for parsed resume.")
         flash(f"Error generating PDF: {str(e)}", 'error')
@@ -230,7 +407,7 @@ def download_parsed_resume_pdf():
 @app.route('/download_recommended_jobs_json')
 def download_recommended_jobs_json():
     # This route will now download the LLM-powered recommendations
-    llm_recommended_jobs = session.get('llm_recommended_jobs')
+    llm_recommended_jobs = get_result_data('llm_recommended_jobs')
     if not llm_recommended_jobs:
         flash('No LLM job recommendations available for download.', 'error')
         return redirect(url_for('upload_page'))
@@ -253,5 +430,19 @@ def download_recommended_jobs_json():
         return redirect(url_for('show_results')) # Redirect to results page on error
 
 
+# --- Prometheus metrics: stage timings, Gemini usage, fallbacks, DB rows and cache stats ---
+@app.route('/metrics')
+def metrics():
+    return Response(render_metrics(), content_type=METRICS_CONTENT_TYPE)
+
+
+# Build the shared Gemini clients off the request path, without delaying startup
+# (not in PDF worker processes, which may import this module again)
+if Config.LLM_WARM_UP and multiprocessing.parent_process() is None:
+    warm_up_clients_in_background()
+
+logger.info(f"App module loaded in {(time.perf_counter() - _import_started) * 1000:.0f} ms")
+
+
 if __name__ == '__main__':
     app.run(debug=True) # Set debug=False for production
@@ -0,0 +1,62 @@
+"""
+Measure how long a fresh interpreter takes to import the Flask app, which is
+what every gunicorn worker pays on boot:
+    python -m benchmarks.bench_cold_start --runs 5
+
+Also lists the slowest imports (cumulative, from python -X importtime) so
+regressions can be traced to the module that introduced them.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_app(extra_args=()):
+    started = time.perf_counter()
+    # Without the background client warm-up, which would still be running when the interpreter exits
+    env = dict(os.environ, LLM_WARM_UP="0")
+    result = subprocess.run([sys.executable, *extra_args, "-c", "import app"], cwd=ROOT,
+                            capture_output=True, text=True, env=env)
+    return result, time.perf_counter() - started
+
+
+def slowest_imports(stderr, top):
+    """(cumulative microseconds, module) of the top imports in -X importtime output"""
+    timings = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = (part.strip() for part in line[len("import time:"):].split("|", 2))
+        timings.append((int(cumulative), module.strip()))
+    return sorted(timings, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports to list")
+    args = parser.parse_args()
+
+    samples = []
+    for _ in range(args.runs):
+        result, elapsed = import_app()
+        if result.returncode != 0:
+            print(f"import app failed:\n{result.stderr[-2000:]}")
+            return
+        samples.append(elapsed)
+    print(f"{'import app':<24} median {statistics.median(samples) * 1000:9.1f} ms   "
+          f"min {min(samples) * 1000:9.1f} ms   max {max(samples) * 1000:9.1f} ms")
+
+    result, _ = import_app(("-X", "importtime"))
+    print("\nSlowest imports (cumulative):")
+    for cumulative, module in slowest_imports(result.stderr, args.top):
+        print(f"{cumulative / 1000:9.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
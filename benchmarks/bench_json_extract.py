@@ -0,0 +1,83 @@
+"""
+Benchmark utils.json_extract.extract_json against the regex-based cleaners it
+replaced, on large and adversarial LLM responses.
+
+The legacy matcher regex backtracks exponentially on unbalanced braces (about
+50 s for a 200-character reply), so the largest adversarial case is only run
+through the new extractor.
+
+Run from the project root:
+    python -m benchmarks.bench_json_extract
+"""
+import re
+import json
+import time
+from utils.json_extract import extract_json
+
+
+def legacy_matcher_extract(response, expect_array=False):
+    """ResumeJobMatcher._clean_json_response before the shared extractor"""
+    try:
+        return json.loads(response)
+    except json.JSONDecodeError:
+        pass
+    response = response.replace("```json", "").replace("```", "").strip()
+    response = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', response)
+    json_pattern = r'(\{(?:[^{}]|(?:\{.*?\}))*\})' if not expect_array else r'(\[(?:[^\[\]]|(?:\{.*?\}))*\])'
+    for json_str in re.findall(json_pattern, response, re.DOTALL):
+        try:
+            return json.loads(json_str)
+        except json.JSONDecodeError:
+            try:
+                json_str = re.sub(r',\s*([}\]])', r'\1', json_str)
+                json_str = re.sub(r'([{,])\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*:', r'\1"\2":', json_str)
+                return json.loads(json_str)
+            except json.JSONDecodeError:
+                continue
+    return [] if expect_array else {}
+
+
+def large_valid_response(jobs):
+    payload = [{"job_id": str(i), "match_score": i % 100, "matched_skills": ["Python", "SQL"],
+                "missing_skills": ["Go"], "match_reasoning": "Strong overlap. " * 20} for i in range(jobs)]
+    return "Here are the results:\n```json\n" + json.dumps(payload, indent=2) + "\n```\nLet me know!"
+
+
+def cases():
+    """(name, response text, expect_array, run legacy extractor)"""
+    yield "large fenced array (200 jobs)", large_valid_response(200), True, True
+    yield "trailing commas + unquoted keys", '```json\n{match_score: 80, "matched_skills": ["a", "b",],}\n```', False, True
+    yield "truncated object", '{"match_score": 70, "matched_skills": ["Python", "Dja', False, True
+    # An unclosed brace before many small objects: each extra object multiplies the legacy regex's backtracking
+    yield "unbalanced brace, 16 objects", "{" + '{"a": 1}' * 16 + " no closing", False, True
+    yield "unbalanced brace, 20 objects", "{" + '{"a": 1}' * 20 + " no closing", False, True
+    yield "unbalanced brace, 5000 objects", "{" + '{"a": 1}' * 5000 + " no closing", False, False
+    # Many unmatched openers in prose: quadratic for the legacy regex
+    yield "brace-heavy prose (16k chars)", ("{ x " * 4000) + '{"match_score": 5}', False, True
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def describe(result):
+    return type(result).__name__ + ("" if result else " (empty)")
+
+
+def main():
+    print(f"{'case':34} {'chars':>7} {'new (ms)':>9} {'legacy (ms)':>12}  new result / legacy result")
+    for name, text, expect_array, run_legacy in cases():
+        new_time, new_result = timed(extract_json, text, list if expect_array else dict)
+        if run_legacy:
+            legacy_time, legacy_result = timed(legacy_matcher_extract, text, expect_array)
+            legacy = f"{legacy_time * 1000:12.2f}"
+            legacy_outcome = describe(legacy_result)
+        else:
+            legacy, legacy_outcome = f"{'skipped':>12}", "-"
+        print(f"{name:34} {len(text):7d} {new_time * 1000:9.2f} {legacy}  {describe(new_result)} / {legacy_outcome}")
+
+
+if __name__ == "__main__":
+    main()
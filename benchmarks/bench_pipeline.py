@@ -0,0 +1,116 @@
+"""
+Benchmark the upload pipeline end to end without network access or an API key.
+
+First record the Gemini calls for a resume once, against the live API:
+    LLM_BACKEND=record LLM_CACHE_ENABLED=0 python -m benchmarks.bench_pipeline --pdf resume.pdf --runs 1
+
+Then replay them as often as needed, optionally with the recorded latency
+and injected failures:
+    python -m benchmarks.bench_pipeline --pdf resume.pdf --runs 5
+    LLM_REPLAY_LATENCY_SCALE=1 LLM_REPLAY_ERROR_RATE=0.1 python -m benchmarks.bench_pipeline --pdf resume.pdf
+
+Jobs come from a JSON file (default: the scraper's jobscraping/cleaned.json)
+instead of the database. The /process-resume stage imports the Flask app and
+times the route through the upload queue until the job is done (WeasyPrint is
+only loaded by the PDF download route and its render workers); pass --skip-app
+to time the parser and matcher calls alone.
+"""
+import os
+
+# Replay by default, and keep the response and parsed resume caches from hiding replayed calls
+os.environ.setdefault("LLM_BACKEND", "replay")
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+os.environ.setdefault("RESUME_CACHE_ENABLED", "0")
+os.environ.setdefault("LLM_REQUESTS_PER_MINUTE", "100000")
+
+import io
+import json
+import time
+import argparse
+import statistics
+from resume_scraper.resume_parser import parse_resume_from_file, generate_resume_summary
+from models.job_matcher import ResumeJobMatcher
+from config import Config
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def report(name, samples):
+    print(f"{name:<24} median {statistics.median(samples) * 1000:9.1f} ms   "
+          f"min {min(samples) * 1000:9.1f} ms   max {max(samples) * 1000:9.1f} ms")
+
+
+def bench_library(pdf_bytes, jobs, runs):
+    matcher = ResumeJobMatcher()
+    samples = {"parse_resume_from_file": [], "generate_resume_summary": [], "match_resume_to_jobs": []}
+    for _ in range(runs):
+        # A fresh matcher memo per run, so every run pays for keyword extraction
+        matcher._features_memo.clear()
+        parsed, elapsed = timed(lambda: parse_resume_from_file(io.BytesIO(pdf_bytes)))
+        samples["parse_resume_from_file"].append(elapsed)
+        if not parsed or "error" in parsed:
+            print(f"Parsing failed: {parsed.get('error') if parsed else 'no data'}")
+            return
+        summary, elapsed = timed(lambda: generate_resume_summary(parsed))
+        samples["generate_resume_summary"].append(elapsed)
+        matched, elapsed = timed(lambda: matcher.match_resume_to_jobs(parsed, summary, jobs))
+        samples["match_resume_to_jobs"].append(elapsed)
+    for name, values in samples.items():
+        report(name, values)
+    print(f"{len(matched)} jobs ranked in the last run")
+
+
+def bench_app(pdf_bytes, jobs, runs):
+    import app as flask_app
+    flask_app.get_catalog_jobs = lambda: jobs
+    client = flask_app.app.test_client()
+    samples = []
+    for _ in range(runs):
+        flask_app.get_matcher()._features_memo.clear()
+        status, elapsed = timed(lambda: upload_and_wait(client, pdf_bytes))
+        if status.get("state") != "done":
+            print(f"/process-resume failed: {json.dumps(status)[:200]}")
+            return
+        samples.append(elapsed)
+    report("/process-resume to done", samples)
+
+
+def upload_and_wait(client, pdf_bytes):
+    """Queue the upload and poll its status until the job finishes"""
+    response = client.post("/process-resume", data={"cv-file": (io.BytesIO(pdf_bytes), "resume.pdf")})
+    if response.status_code != 202:
+        return {"state": "rejected", "status_code": response.status_code, "body": response.get_data(as_text=True)}
+    status_url = response.get_json()["status_url"]
+    while True:
+        status = client.get(status_url).get_json()
+        if status.get("state") in ("done", "error"):
+            return status
+        time.sleep(0.005)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", required=True, help="resume PDF to upload")
+    parser.add_argument("--jobs", default=os.path.join("jobscraping", "cleaned.json"), help="JSON list of jobs")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--skip-app", action="store_true", help="only time the parser and matcher calls, not the Flask route")
+    args = parser.parse_args()
+
+    with open(args.pdf, "rb") as pdf_file:
+        pdf_bytes = pdf_file.read()
+    with open(args.jobs, encoding="utf-8") as jobs_file:
+        jobs = [{"id": position, **job} for position, job in enumerate(json.load(jobs_file))]
+
+    print(f"LLM backend: {Config.LLM_BACKEND} ({Config.LLM_RECORDINGS_PATH}), "
+          f"latency scale {Config.LLM_REPLAY_LATENCY_SCALE:g}, error rate {Config.LLM_REPLAY_ERROR_RATE:g}")
+    bench_library(pdf_bytes, jobs, args.runs)
+    if not args.skip_app:
+        bench_app(pdf_bytes, jobs, args.runs)
+
+
+if __name__ == "__main__":
+    main()
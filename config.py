@@ -5,7 +5,105 @@ class Config:
     UPLOAD_FOLDER = 'uploads'
     MAX_CONTENT_LENGTH = 5 * 1024 * 1024 # 5 MB limit
     ALLOWED_EXTENSIONS = {'pdf', 'docx', 'doc', 'rtf'}
-    TOP_N_FOR_LLM = 30
+    TOP_N_FOR_LLM = 30  # candidates taken from the pre-ranker; the ranking scheduler decides how many reach Gemini
+    RANKING_TOP_K = int(os.getenv('RANKING_TOP_K', '5'))  # best matches that must be settled before ranking stops early
+    RANKING_MIN_PRE_SCORE_RATIO = float(os.getenv('RANKING_MIN_PRE_SCORE_RATIO', '0.2'))  # below this fraction of the best pre-score, skip Gemini and drop the job
+    # Gemini ranking calls per upload; by default no more than the top-k the ranking settles on,
+    # so early stopping can only save calls (skipped candidates only fill the results up to the top-k)
+    RANKING_MAX_LLM_CALLS = int(os.getenv('RANKING_MAX_LLM_CALLS', str(RANKING_TOP_K)))
+    RANKING_TIME_BUDGET_SECONDS = float(os.getenv('RANKING_TIME_BUDGET_SECONDS', '45'))  # no new ranking calls after this
+    RANKING_PATIENCE = int(os.getenv('RANKING_PATIENCE', '3'))  # results that leave the top-k unchanged before stopping
+    RANKING_SCORE_MARGIN = float(os.getenv('RANKING_SCORE_MARGIN', '20'))  # how far Gemini may score above the local rubric
+    LLM_RANKING_CONCURRENCY = int(os.getenv('LLM_RANKING_CONCURRENCY', '5'))  # parallel Gemini ranking calls per upload
+    LLM_RANKING_MODE = os.getenv('LLM_RANKING_MODE', 'per_job')  # 'per_job', 'batched' or 'local' (no LLM)
+    LLM_RANKING_BATCH_SIZE = int(os.getenv('LLM_RANKING_BATCH_SIZE', '5'))  # jobs scored per Gemini call in batched mode
+    LOCAL_ENRICH_TOP_K = int(os.getenv('LOCAL_ENRICH_TOP_K', '0'))  # jobs re-ranked by Gemini in local mode
+    PRE_RANKER = os.getenv('PRE_RANKER', 'tfidf')  # 'tfidf' (job text similarity) or 'skills' (skill overlap)
+    RESUME_FEATURES_MEMO_SIZE = 128  # resume feature bundles kept in memory per matcher
+    # Approximate token budgets for the resume/job data embedded in each prompt type
+    PROMPT_TOKEN_BUDGETS = {
+        'default': 3000,
+        'resume': 2500,     # resume details in matching and recommendation prompts
+        'job': 800,         # each job listing in matching prompts
+        'keywords': 3000,
+        'summary': 3000,
+        'interests': 2000,
+        'ats': 8000         # raw resume text sent to the ATS extractor
+    }
+    GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.0-flash')  # shared by the resume parser and the job matcher
+    # Generation settings of the matcher's ranking/keyword/recommendation calls
+    LLM_GENERATION_PARAMS = {
+        'temperature': 0.3,  # Lower temperature for more consistent responses
+        'max_output_tokens': 4096,
+        'top_p': 0.8,
+        'top_k': 40
+    }
+    RESUME_GENERATION_PARAMS = {}  # resume parsing and summaries use the model defaults
+    LLM_WARM_UP = os.getenv('LLM_WARM_UP', '1') == '1'  # build the Gemini clients in the background at startup
+    LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', '1') == '1'
+    LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', os.path.join('cache', 'llm_cache.sqlite3'))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '5000'))
+    LLM_CACHE_TTL_SECONDS = int(os.getenv('LLM_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))  # 7 days
+    # Upload results, kept server-side by result id (the session only stores the id)
+    RESULTS_STORE_PATH = os.getenv('RESULTS_STORE_PATH', os.path.join('cache', 'results.sqlite3'))
+    RESULTS_TTL_SECONDS = int(os.getenv('RESULTS_TTL_SECONDS', str(24 * 3600)))
+    RESULTS_MAX_ENTRIES = int(os.getenv('RESULTS_MAX_ENTRIES', '5000'))
+    # Parsed resume PDFs: rendered in worker processes, cached by resume data and template version
+    PDF_CACHE_ENABLED = os.getenv('PDF_CACHE_ENABLED', '1') == '1'
+    PDF_CACHE_PATH = os.getenv('PDF_CACHE_PATH', os.path.join('cache', 'pdf_cache.sqlite3'))
+    PDF_CACHE_MAX_ENTRIES = int(os.getenv('PDF_CACHE_MAX_ENTRIES', '500'))
+    PDF_CACHE_TTL_SECONDS = int(os.getenv('PDF_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))  # 7 days
+    PDF_RENDER_WORKERS = int(os.getenv('PDF_RENDER_WORKERS', '2'))
+    PDF_RENDER_TIMEOUT_SECONDS = float(os.getenv('PDF_RENDER_TIMEOUT_SECONDS', '30'))
+    PDF_PRERENDER = os.getenv('PDF_PRERENDER', '1') == '1'  # render the PDF as soon as an upload is processed
+    # PostgreSQL connection pool (per process) and the batch size of streamed job queries
+    DB_POOL_MIN_CONNECTIONS = int(os.getenv('DB_POOL_MIN_CONNECTIONS', '2'))  # kept open while idle
+    DB_POOL_MAX_CONNECTIONS = int(os.getenv('DB_POOL_MAX_CONNECTIONS', '8'))
+    DB_POOL_TIMEOUT_SECONDS = float(os.getenv('DB_POOL_TIMEOUT_SECONDS', '10'))  # longest wait for a free connection
+    DB_POOL_CHECK_IDLE_SECONDS = float(os.getenv('DB_POOL_CHECK_IDLE_SECONDS', '30'))  # idle longer: SELECT 1 before use
+    DB_STREAM_BATCH_SIZE = int(os.getenv('DB_STREAM_BATCH_SIZE', '500'))
+    # Jobs are matched from an in-memory copy of the jobs table, refreshed with the rows changed since the last load
+    JOB_CATALOG_ENABLED = os.getenv('JOB_CATALOG_ENABLED', '1') == '1'
+    JOB_CATALOG_REFRESH_SECONDS = float(os.getenv('JOB_CATALOG_REFRESH_SECONDS', '60'))
+    JOB_CATALOG_FULL_RELOAD_SECONDS = float(os.getenv('JOB_CATALOG_FULL_RELOAD_SECONDS', '3600'))  # picks up deletions
+    JOB_CATALOG_NOTIFY_CHANNEL = os.getenv('JOB_CATALOG_NOTIFY_CHANNEL', 'jobs_changed')  # also read by the scraper; '' refreshes on the timer only
+    # Upload pipeline queue: uploads processed at once per process, and how many may wait or run
+    PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', '4'))
+    PIPELINE_MAX_PENDING = int(os.getenv('PIPELINE_MAX_PENDING', '32'))
+    PIPELINE_JOB_RETENTION_SECONDS = float(os.getenv('PIPELINE_JOB_RETENTION_SECONDS', '3600'))  # finished job status
+    # Job status is shared through this SQLite file, so a poll may reach any worker on the host
+    PIPELINE_STATUS_PATH = os.getenv('PIPELINE_STATUS_PATH', os.path.join('cache', 'pipeline_jobs.sqlite3'))
+    PIPELINE_STATUS_MAX_ENTRIES = int(os.getenv('PIPELINE_STATUS_MAX_ENTRIES', '5000'))
+    # 'combined' extracts the resume, summary, keywords and career interests in one Gemini call;
+    # 'separate' uses one call each (the combined mode also falls back to it on an invalid reply)
+    RESUME_EXTRACTION_MODE = os.getenv('RESUME_EXTRACTION_MODE', 'combined')
+    # Parsed resumes and their summary/keywords, keyed by the SHA-256 of the uploaded file
+    RESUME_CACHE_ENABLED = os.getenv('RESUME_CACHE_ENABLED', '1') == '1'
+    RESUME_CACHE_PATH = os.getenv('RESUME_CACHE_PATH', os.path.join('cache', 'resume_cache.sqlite3'))
+    RESUME_CACHE_MAX_ENTRIES = int(os.getenv('RESUME_CACHE_MAX_ENTRIES', '2000'))
+    RESUME_CACHE_TTL_SECONDS = int(os.getenv('RESUME_CACHE_TTL_SECONDS', str(30 * 24 * 3600)))  # 30 days
+    # Gemini quota and resilience settings shared by every LLM call (limits apply per process)
+    LLM_REQUESTS_PER_MINUTE = float(os.getenv('LLM_REQUESTS_PER_MINUTE', '15'))
+    LLM_TOKENS_PER_MINUTE = float(os.getenv('LLM_TOKENS_PER_MINUTE', '1000000'))
+    LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '30'))  # per attempt
+    LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '3'))  # retries of 429s, timeouts and 5xx errors
+    LLM_RETRY_BASE_DELAY = 1.0  # seconds; backoff doubles per attempt, with full jitter
+    LLM_RETRY_MAX_DELAY = 20.0
+    LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv('LLM_QUEUE_TIMEOUT_SECONDS', '60'))  # longest wait for quota
+    LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv('LLM_BREAKER_FAILURE_THRESHOLD', '5'))  # consecutive failures
+    LLM_BREAKER_RESET_SECONDS = float(os.getenv('LLM_BREAKER_RESET_SECONDS', '30'))  # open time before a trial call
+    # 'live' calls Gemini, 'record' also appends every call to LLM_RECORDINGS_PATH, 'replay' answers
+    # from those recordings with no network or API key (disable LLM_CACHE_ENABLED while recording)
+    LLM_BACKEND = os.getenv('LLM_BACKEND', 'live')
+    LLM_RECORDINGS_PATH = os.getenv('LLM_RECORDINGS_PATH', os.path.join('recordings', 'llm_calls.jsonl'))
+    LLM_REPLAY_LATENCY_SCALE = float(os.getenv('LLM_REPLAY_LATENCY_SCALE', '0'))  # 1 replays recorded latency
+    LLM_REPLAY_ERROR_RATE = float(os.getenv('LLM_REPLAY_ERROR_RATE', '0'))  # fraction of replayed calls that fail
+    # Resume PDF text extraction: larger documents are cut off, long ones are split across worker processes
+    PDF_MAX_PAGES = int(os.getenv('PDF_MAX_PAGES', '20'))
+    PDF_MAX_CHARS = int(os.getenv('PDF_MAX_CHARS', '60000'))
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '6'))  # fewer pages are extracted in-process
+    PDF_EXTRACTION_WORKERS = int(os.getenv('PDF_EXTRACTION_WORKERS', str(min(4, os.cpu_count() or 1))))
+    PDF_EXTRACTION_TIMEOUT_SECONDS = float(os.getenv('PDF_EXTRACTION_TIMEOUT_SECONDS', '20'))
     DEFAULT_JOB_SCRAPE_URL = "https://merojob.com/search/?q="
 
     # Ensure upload folder exists
@@ -0,0 +1,25 @@
+"""
+Gunicorn settings for the web app.
+
+Each worker is a separate process, so the Prometheus metrics run in
+prometheus_client's multiprocess mode: workers write their samples to
+PROMETHEUS_MULTIPROC_DIR and a scrape of /metrics on any worker reports the
+whole server. The directory is emptied when the server starts.
+"""
+import os
+import shutil
+import tempfile
+
+# Must be in the environment before the app (and prometheus_client) is imported by the workers
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "cvisionary-metrics"))
+
+
+def on_starting(server):
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -24,6 +24,9 @@ class SaveToPostgreSQLPipeLine:
         
         # Alternative: Use DATABASE_URL (Render provides this)
         self.database_url = os.getenv('DATABASE_URL')
+
+        # Same variable and default as the web app's Config; empty disables the notifications
+        self.notify_channel = os.getenv('JOB_CATALOG_NOTIFY_CHANNEL', 'jobs_changed')
         
         self.conn = None
         self.cur = None
@@ -78,7 +81,28 @@ class SaveToPostgreSQLPipeLine:
                 FOR EACH ROW
                 EXECUTE FUNCTION update_updated_at_column();
             ''')
-            
+
+            # Tell the web app's job catalog to refresh (payload: INSERT, UPDATE or DELETE), on the
+            # channel the app LISTENs on; it is passed to the trigger as an argument
+            self.cur.execute('''
+            CREATE OR REPLACE FUNCTION notify_jobs_changed()
+            RETURNS TRIGGER AS $$
+            BEGIN
+                PERFORM pg_notify(TG_ARGV[0], TG_OP);
+                RETURN NULL;
+            END;
+            $$ language 'plpgsql';
+            ''')
+
+            self.cur.execute("DROP TRIGGER IF EXISTS notify_jobs_changed ON jobs;")
+            if self.notify_channel:
+                self.cur.execute('''
+                CREATE TRIGGER notify_jobs_changed
+                    AFTER INSERT OR UPDATE OR DELETE ON jobs
+                    FOR EACH STATEMENT
+                    EXECUTE FUNCTION notify_jobs_changed(%s);
+                ''', (self.notify_channel,))
+
             self.conn.commit()
             print("PostgreSQL database connection established successfully")
             
@@ -0,0 +1,106 @@
+import json
+import heapq
+import hashlib
+import logging
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+from models.resume_features import normalize_skill
+
+logger = logging.getLogger(__name__)
+
+
+def parse_job_skills(job: Dict) -> List[str]:
+    """
+    Return a job's skills as a list of strings.
+
+    Scraped rows from the jobs table store skills as a JSON-encoded string in
+    `skills`; hand-built job dicts may carry a plain list in `skills_required`.
+    """
+    skills = job.get('skills_required')
+    if skills is None:
+        skills = job.get('skills')
+    if isinstance(skills, str):
+        try:
+            skills = json.loads(skills)
+        except json.JSONDecodeError:
+            skills = skills.split(',')
+    if not isinstance(skills, list):
+        return []
+    return [skill.strip() for skill in skills if isinstance(skill, str) and skill.strip()]
+
+
+def catalog_signature(jobs: List[Dict]) -> str:
+    """Fingerprint of a job catalog's ids and update timestamps, in order (O(catalog))"""
+    digest = hashlib.sha1()
+    for position, job in enumerate(jobs):
+        digest.update(f"{job.get('id', position)}:{job.get('updated_at')}|".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class JobIndex:
+    """
+    Inverted index from normalized skill to the jobs that require it.
+
+    Skills are parsed and normalized once when the index is built, so scoring a
+    resume only touches the postings of the skills it actually contains.
+    """
+
+    def __init__(self, jobs: List[Dict]):
+        self.jobs = jobs
+        self.size = len(jobs)
+        self.signature = catalog_signature(jobs)
+        self.job_skills: List[FrozenSet[str]] = []
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+
+        for job_idx, job in enumerate(jobs):
+            skills = frozenset(normalize_skill(skill) for skill in parse_job_skills(job))
+            self.job_skills.append(skills)
+            for skill in skills:
+                self.postings[skill].append(job_idx)
+
+        logger.info(f"Built job skill index: {len(jobs)} jobs, {len(self.postings)} distinct skills")
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    def is_current(self, jobs: List[Dict]) -> bool:
+        """
+        True if the index was built from this catalog. The job catalog hands out
+        the same list until it changes, so the usual check is an identity test;
+        only a different list object (e.g. a fresh DB fetch) is fingerprinted.
+        """
+        if jobs is self.jobs and len(jobs) == self.size:
+            return True
+        return catalog_signature(jobs) == self.signature
+
+    def score(self, resume_skills: Iterable[str]) -> Dict[int, float]:
+        """Jaccard overlap between the resume skills and every job sharing at least one skill"""
+        resume_skills = {normalize_skill(skill) for skill in resume_skills}
+        resume_skills.discard('')
+        overlap = defaultdict(int)
+        for skill in resume_skills:
+            for job_idx in self.postings.get(skill, ()):
+                overlap[job_idx] += 1
+
+        return {
+            job_idx: shared / (len(resume_skills) + len(self.job_skills[job_idx]) - shared)
+            for job_idx, shared in overlap.items()
+        }
+
+    def top_candidates(self, resume_skills: Iterable[str], n: int) -> List[Tuple[int, float]]:
+        """
+        Return up to n (job index, pre_score) pairs with the highest overlap.
+
+        Ties keep catalog order. When fewer than n jobs share a skill, the rest
+        are filled with zero-score jobs in catalog order, as the full sort did.
+        """
+        scores = self.score(resume_skills)
+        top = heapq.nsmallest(n, scores.items(), key=lambda item: (-item[1], item[0]))
+
+        if len(top) < n:
+            for job_idx in range(len(self.jobs)):
+                if len(top) >= n:
+                    break
+                if job_idx not in scores:
+                    top.append((job_idx, 0.0))
+        return top
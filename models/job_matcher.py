@@ -1,52 +1,91 @@
 import os
 import json
 import logging
-import re
 import subprocess
-from typing import Dict, List, Optional
-from langchain_core.prompts import PromptTemplate
-from langchain_google_genai import GoogleGenerativeAI
-from resume_scraper.resume_parser import parse_resume_from_file, generate_resume_summary # Assuming this is in your project path
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from resume_scraper.resume_parser import parse_resume_from_file, generate_resume_summary, resume_profile_field # Assuming this is in your project path
 from utils.helpers import get_jobs_from_db# Import the helper function
+from utils.cache import cached_llm_call
+from utils.llm_gateway import LLMUnavailableError, get_llm_gateway
+from utils.llm_clients import get_client_provider
+from models.resume_features import ResumeFeatures, normalize_skill, resume_fingerprint
+from models.job_index import JobIndex, parse_job_skills
+from models.tfidf_ranker import TfidfJobRanker, resume_query_text
+from models.local_scorer import LocalJobScorer
+from models.ranking_scheduler import RankingScheduler
+from utils.prompt_compiler import compile_job, compile_resume
+from models.prompts import BATCH_MATCHING_PROMPT, KEYWORD_PROMPT, MATCHING_PROMPT, RECOMMENDATION_PROMPT
+from utils.json_extract import extract_json
+from utils.metrics import record_fallback, record_ranking_skip
 from config import Config
 
-import re
 logger = logging.getLogger(__name__)
 
 ALLOWED_EXTENSIONS = {'pdf', 'docx', 'doc', 'rtf'}
-TOP_N_FOR_LLM = 5
 
 class ResumeJobMatcher:
-    def __init__(self, model_name="gemini-2.0-flash"):
+    def __init__(self, model_name: Optional[str] = None, ranking_concurrency: Optional[int] = None,
+                 ranking_mode: Optional[str] = None, ranking_batch_size: Optional[int] = None,
+                 pre_ranker: Optional[str] = None, local_enrich_top_k: Optional[int] = None):
         """
         Initialize the ResumeJobMatcher with Gemini 2.0 Flash model.
         
         Args:
-            model_name: The Gemini model to use (default: gemini-2.0-flash-exp)
+            model_name: The Gemini model to use (default: Config.GEMINI_MODEL)
+            ranking_concurrency: Max parallel Gemini calls when ranking jobs
+                (default: Config.LLM_RANKING_CONCURRENCY, 1 ranks sequentially)
+            ranking_mode: "per_job" sends one prompt per job, "batched" packs
+                ranking_batch_size jobs into each prompt, "local" scores jobs with the
+                rubric in LocalJobScorer without Gemini (default: Config.LLM_RANKING_MODE)
+            ranking_batch_size: Jobs per prompt in batched mode (default: Config.LLM_RANKING_BATCH_SIZE)
+            local_enrich_top_k: In local mode, re-rank this many of the best jobs with
+                Gemini for detailed reasoning (default: Config.LOCAL_ENRICH_TOP_K)
+            pre_ranker: Candidate retrieval before LLM ranking, "tfidf" over the job text
+                fields or "skills" overlap (default: Config.PRE_RANKER)
         
         Environment Variables Required:
             GOOGLE_API_KEY: Your Google AI API key
         """
+        self.ranking_concurrency = max(1, ranking_concurrency or Config.LLM_RANKING_CONCURRENCY)
+        self.ranking_mode = ranking_mode or Config.LLM_RANKING_MODE
+        self.ranking_batch_size = max(1, ranking_batch_size or Config.LLM_RANKING_BATCH_SIZE)
+        self._features_memo = OrderedDict()
+        self._features_lock = threading.Lock()
+        self.pre_ranker = pre_ranker or Config.PRE_RANKER
+        self.local_enrich_top_k = Config.LOCAL_ENRICH_TOP_K if local_enrich_top_k is None else local_enrich_top_k
+        self._job_index = None
+        self._job_index_lock = threading.Lock()
+        self._tfidf_ranker = TfidfJobRanker()
+
         try:
             # Get the API key from environment
             api_key = os.getenv('GEMINI_API_KEY')
-            if not api_key:
+            if not api_key and Config.LLM_BACKEND != "replay":
                 raise ValueError("GEMINI_API_KEY environment variable is required")
             
-            # Initialize Gemini model
-            self.llm = GoogleGenerativeAI(
-                model=model_name,
-                google_api_key=api_key,
-                temperature=0.3,  # Lower temperature for more consistent responses
-                max_output_tokens=4096,
-                top_p=0.8,
-                top_k=40
-            )
-            logger.info(f"Initialized Gemini model: {model_name}")
+            # Gemini model settings; the client is shared process-wide and created on first use
+            self.model_name = model_name or Config.GEMINI_MODEL
+            self.generation_params = dict(Config.LLM_GENERATION_PARAMS)
+            self._llm = None
         except Exception as e:
             logger.error(f"Failed to initialize Gemini model: {e}")
             raise
 
+    @property
+    def llm(self):
+        """Gemini client from the shared provider, unless one was assigned to this matcher"""
+        if self._llm is not None:
+            return self._llm
+        return get_client_provider().langchain_llm(self.model_name, self.generation_params)
+
+    @llm.setter
+    def llm(self, llm):
+        self._llm = llm
+
     def scrape_job_listings(self, job_sites: List[str]) -> List[Dict]:
         scrapy_project_path = os.path.join(os.getcwd(), 'jobscraping')
         try:
@@ -79,84 +118,36 @@ class ResumeJobMatcher:
             logger.error(f"Error fetching jobs from database: {e}")
             return []
 
+    def _invoke(self, prompt: str) -> str:
+        """Invoke Gemini through the shared response cache and the rate-limited LLM gateway"""
+        gateway = get_llm_gateway()
+        return cached_llm_call(self.model_name, self.generation_params, prompt,
+                               lambda: gateway.call(prompt, lambda: self.llm.invoke(prompt)))
+
     def _clean_json_response(self, response: str, expect_array: bool = False) -> Dict | List:
         """Clean and parse JSON response from Gemini"""
-        try:
-            return json.loads(response)
-        except json.JSONDecodeError:
-            pass
-        
-        original_response = response
-        
-        # Remove markdown code blocks
-        response = response.replace("```json", "").replace("```", "").strip()
-        
-        # Remove control characters
-        try:
-            response = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', response)
-        except Exception as e:
-            logger.error(f"Error cleaning control characters: {e}")
-        
-        # Extract JSON pattern
-        json_pattern = r'(\{(?:[^{}]|(?:\{.*?\}))*\})' if not expect_array else r'(\[(?:[^\[\]]|(?:\{.*?\}))*\])'
-        matches = re.findall(json_pattern, response, re.DOTALL)
-        
-        if not matches:
-            logger.error(f"No JSON object found in response: {original_response}")
+        parsed = extract_json(response, list if expect_array else dict)
+        if parsed is None:
+            logger.error(f"All JSON extraction attempts failed on: {response}")
             return [] if expect_array else {}
-        
-        # Try to parse each match
-        for json_str in matches:
-            try:
-                return json.loads(json_str)
-            except json.JSONDecodeError:
-                try:
-                    # Fix common JSON issues
-                    json_str = re.sub(r',\s*([}\]])', r'\1', json_str)
-                    json_str = re.sub(r'([{,])\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*:', r'\1"\2":', json_str)
-                    return json.loads(json_str)
-                except json.JSONDecodeError:
-                    continue
-        
-        logger.error(f"All JSON extraction attempts failed on: {original_response}")
-        return [] if expect_array else {}
+        return parsed
 
     def extract_resume_keywords(self, resume_data: Dict) -> List[str]:
         """Extract keywords from resume using Gemini"""
-        keyword_prompt = PromptTemplate(
-            input_variables=["resume_data"],
-            template="""Extract only the specific technical and soft skills, tools, and technologies explicitly mentioned in the provided resume data. Do not infer or add any skills, tools, or technologies that are not present in the resume.
-
-Focus on extracting:
-- Technical skills and programming languages
-- Software tools and technologies
-- Frameworks and libraries
-- Certifications and qualifications
-- Industry-specific terminology
-- Soft skills explicitly mentioned
-- Project technologies and methodologies
-
-Return ONLY a valid JSON array of strings containing the exact keywords found in the resume data. 
-
-Example format: ["Python", "Machine Learning", "SQL", "Project Management", "Communication"]
-
-If no keywords are found, return an empty array: []
-
-Resume Data:
-{resume_data}
-
-JSON Array:"""
-        )
-        
         try:
             logger.debug(f"Resume data for keyword extraction: {json.dumps(resume_data, indent=2)}")
             
             if not resume_data:
                 logger.warning("Empty resume data provided for keyword extraction")
                 return []
+
+            # Already extracted by the combined resume extraction call
+            keywords = resume_profile_field(resume_data, "keywords")
+            if keywords:
+                return keywords
             
             # Invoke Gemini
-            response = self.llm.invoke(keyword_prompt.format(resume_data=json.dumps(resume_data)))
+            response = self._invoke(KEYWORD_PROMPT.format(resume_data=compile_resume(resume_data, "keywords")))
             
             if not response or not response.strip():
                 logger.warning("Gemini returned empty response for keywords")
@@ -178,210 +169,401 @@ JSON Array:"""
             logger.error(f"Error extracting resume keywords: {e}")
             return []
 
+    def build_resume_features(self, resume_data: Dict, extract_keywords: bool = True,
+                              keywords: Optional[List[str]] = None) -> ResumeFeatures:
+        """
+        Compute the per-resume feature bundle once and memoize it by resume fingerprint,
+        so recommendation and matching for the same upload share one keyword extraction.
+        Keywords already known (e.g. from the parsed resume cache) are used as given.
+        With extract_keywords=False no Gemini call is made and the bundle is not memoized.
+        Neither is a bundle without keywords: extract_resume_keywords returns [] when
+        Gemini fails, and a later upload of the same resume should try again.
+        """
+        fingerprint = resume_fingerprint(resume_data)
+        with self._features_lock:
+            features = self._features_memo.get(fingerprint)
+            if features is not None:
+                self._features_memo.move_to_end(fingerprint)
+                return features
+
+        if keywords is None:
+            if not extract_keywords:
+                return ResumeFeatures.from_resume(resume_data, [], fingerprint=fingerprint)
+            keywords = self.extract_resume_keywords(resume_data)
+            logger.info(f"Extracted keywords from resume: {keywords}")
+        features = ResumeFeatures.from_resume(resume_data, keywords, fingerprint=fingerprint)
+        if not keywords:
+            return features
+
+        with self._features_lock:
+            self._features_memo[fingerprint] = features
+            while len(self._features_memo) > Config.RESUME_FEATURES_MEMO_SIZE:
+                self._features_memo.popitem(last=False)
+        return features
+
+    def _get_job_index(self, job_listings: List[Dict]) -> JobIndex:
+        """Return the skill index for this catalog, rebuilding it only when the catalog changed"""
+        with self._job_index_lock:
+            if self._job_index is None or not self._job_index.is_current(job_listings):
+                self._job_index = JobIndex(job_listings)
+            return self._job_index
+
+    def _select_candidates(self, resume_data: Dict, features: ResumeFeatures, job_listings: List[Dict],
+                           n: int) -> List[Tuple[int, float]]:
+        """Return the top n (job index, pre_score) pairs from the configured pre-ranker"""
+        if self.pre_ranker == "tfidf":
+            with self._job_index_lock:
+                self._tfidf_ranker.fit(job_listings)
+                return self._tfidf_ranker.top_candidates(resume_query_text(resume_data, features.keywords), n)
+        return self._get_job_index(job_listings).top_candidates(features.normalized_skills, n)
+
     def _fallback_scoring(self, resume_data, job):
         """Fallback scoring method when LLM fails"""
-        resume_skills = set(resume_data.get("Technical Skills", []))
-        job_skills = set(job.get("skills_required", []))
-        common_skills = resume_skills & job_skills
+        resume_skills = {normalize_skill(skill) for skill in resume_data.get("Technical Skills", [])}
+        job_skills = parse_job_skills(job)
+        common_skills = [skill for skill in job_skills if normalize_skill(skill) in resume_skills]
+        missing_skills = [skill for skill in job_skills if normalize_skill(skill) not in resume_skills]
         score = int(len(common_skills) / max(len(job_skills), 1) * 100) if job_skills else 0
         
         return {
             "match_score": score,
-            "matched_skills": list(common_skills),
-            "missing_skills": list(job_skills - resume_skills),
+            "matched_skills": common_skills,
+            "missing_skills": missing_skills,
             "match_reasoning": "Fallback scoring used due to LLM processing error.",
             "job_fit": "Good Match" if score > 50 else "Poor Match"
         }
 
-    def match_resume_to_jobs(self, resume_data: Dict, resume_summary: str, job_listings: List[Dict]) -> List[Dict]:
-        """Match resume to job listings using Gemini"""
+    def _finalize_match_details(self, match_data: Dict, job: Dict, source: str) -> Dict:
+        """
+        Validate the match score and derive job fit and reasoning. source records who
+        scored the job: "gemini", or "local" for the local rubric and fallback scoring.
+        """
+        # Validate and fix match score
+        match_score = match_data.get("match_score", 0)
+        if not isinstance(match_score, (int, float)) or not (0 <= match_score <= 100):
+            matched_skills_count = len(match_data.get("matched_skills", []))
+            required_skills_count = len(parse_job_skills(job))
+            match_score = int((matched_skills_count / required_skills_count) * 100) if required_skills_count > 0 else 0
+            match_data["match_score"] = match_score
+
+        # Set job fit based on score
+        if match_score >= 80:
+            match_data["job_fit"] = "Excellent Match"
+        elif match_score >= 60:
+            match_data["job_fit"] = "Good Match"
+        elif match_score >= 40:
+            match_data["job_fit"] = "Moderate Match"
+        else:
+            match_data["job_fit"] = "Poor Match"
+
+        # Ensure reasoning exists
+        if not match_data.get("match_reasoning"):
+            match_data["match_reasoning"] = f"Score based on skill overlap and experience alignment."
+
+        match_data["score_source"] = source
+        return match_data
+
+    def _rank_job(self, resume_data: Dict, job: Dict, build_prompt: Callable[[Dict], str], position: int, total: int,
+                  fallback: Optional[Callable[[Dict], Dict]] = None) -> Dict:
+        """Rank a single job with Gemini, falling back to skill overlap (or the given fallback) on failure"""
+        fallback = fallback or (lambda failed_job: self._fallback_scoring(resume_data, failed_job))
+        try:
+            logger.info(f"Ranking job {position}/{total}: {job.get('job_title', 'Unknown Job')}")
+
+            # Get match analysis from Gemini
+            match_result = self._invoke(build_prompt(job))
+            source = "gemini"
+
+            if not match_result or not match_result.strip():
+                logger.warning(f"Empty response from Gemini for job {position}, using fallback scoring")
+                record_fallback("empty_response")
+                match_data, source = fallback(job), "local"
+            else:
+                match_data = self._clean_json_response(match_result, expect_array=False)
+                if not match_data:
+                    logger.warning(f"Failed to parse Gemini response for job {position}, using fallback scoring")
+                    record_fallback("invalid_json")
+                    match_data, source = fallback(job), "local"
+
+            return {**job, "match_details": self._finalize_match_details(match_data, job, source)}
+
+        except LLMUnavailableError as e:
+            logger.warning(f"Gemini unavailable for job {position} ({e}), using fallback scoring")
+            record_fallback("llm_unavailable")
+            return {**job, "match_details": self._finalize_match_details(fallback(job), job, "local")}
+        except Exception as e:
+            # e.g. a non-retryable API error (bad request, auth): score the job like an unavailable API
+            logger.error(f"Error ranking job {position}: {e}, using fallback scoring")
+            record_fallback("error")
+            return {**job, "match_details": self._finalize_match_details(fallback(job), job, "local")}
+
+    def _rank_job_batch(self, batch: List[Tuple[int, Dict]], build_batch_prompt: Callable[[List[Tuple[str, Dict]]], str],
+                        rank_single: Callable[[int, Dict], Dict], fallback: Callable[[int, Dict], Dict],
+                        may_rank_single: Callable[[], bool]) -> List[Dict]:
+        """
+        Rank several jobs with one Gemini call. Jobs missing from the reply are ranked
+        individually while may_rank_single() allows another call, otherwise (and when
+        Gemini is unavailable) they are scored by fallback(position, job).
+        """
+        # Prefer the database id, fall back to the rank position for jobs without one
+        keyed_batch = [(str(job.get('id', f"job-{position}")), position, job) for position, job in batch]
+        replies = {}
+        retry_singly = True
+        try:
+            logger.info(f"Ranking jobs {batch[0][0]}-{batch[-1][0]} in one batched Gemini call")
+            response = self._invoke(build_batch_prompt([(job_id, job) for job_id, _, job in keyed_batch]))
+
+            if response and response.strip():
+                parsed = self._clean_json_response(response, expect_array=True)
+                for entry in parsed if isinstance(parsed, list) else []:
+                    if not isinstance(entry, dict) or "job_id" not in entry:
+                        continue
+                    # Accept both flat entries and entries with a nested match_details object
+                    details = entry.get("match_details", entry)
+                    if isinstance(details, dict):
+                        replies[str(entry["job_id"])] = {k: v for k, v in details.items() if k != "job_id"}
+            else:
+                logger.warning("Empty response from Gemini for job batch, ranking jobs individually")
+        except LLMUnavailableError as e:
+            # Calls for the single jobs would fail the same way
+            logger.warning(f"Gemini unavailable for job batch ({e}), using fallback scoring")
+            retry_singly = False
+        except Exception as e:
+            logger.error(f"Error ranking job batch: {e}")
+
+        matched_jobs = []
+        for job_id, position, job in keyed_batch:
+            match_data = replies.get(job_id)
+            if match_data:
+                matched_jobs.append({**job, "match_details": self._finalize_match_details(match_data, job, "gemini")})
+                continue
+            record_fallback("missing_from_batch")
+            if retry_singly and may_rank_single():
+                logger.warning(f"Job {position} missing from batched Gemini reply, ranking it individually")
+                matched_jobs.append(rank_single(position, job))
+            else:
+                logger.warning(f"Job {position} missing from batched Gemini reply, using fallback scoring")
+                matched_jobs.append(fallback(position, job))
+        return matched_jobs
+
+    def _rank_jobs_locally(self, resume_data: Dict, features: ResumeFeatures, jobs_to_rank: List[Dict],
+                           build_prompt: Callable[[Dict], str]) -> List[Dict]:
+        """Score jobs with the local rubric, then optionally let Gemini re-rank the best few"""
+        scorer = LocalJobScorer(resume_data, features.keywords)
+        matched_jobs = [
+            {**job, "match_details": self._finalize_match_details(scorer.score(job), job, "local")}
+            for job in jobs_to_rank
+        ]
+        logger.info(f"Scored {len(matched_jobs)} jobs with the local rubric.")
+
+        enrich_count = min(self.local_enrich_top_k, len(matched_jobs))
+        if enrich_count <= 0:
+            return matched_jobs
+
+        matched_jobs.sort(key=lambda x: x['match_details']['match_score'], reverse=True)
+        local_details = [matched_job.pop('match_details') for matched_job in matched_jobs[:enrich_count]]
+
+        def enrich(item: Tuple[int, Dict]) -> Dict:
+            position, job = item
+            # A failed Gemini call keeps the local rubric result instead of the skill-overlap fallback
+            return self._rank_job(resume_data, job, build_prompt, position, enrich_count,
+                                  fallback=lambda _: local_details[position - 1])
+
+        enriched = self._run_concurrently(enrich, list(enumerate(matched_jobs[:enrich_count], 1)))
+        return enriched + matched_jobs[enrich_count:]
+
+    def _iter_concurrently(self, fn: Callable, items: List,
+                           may_submit: Optional[Callable[[], bool]] = None) -> Iterator[Tuple[int, object]]:
+        """
+        Yield (item index, fn(item)) with up to ranking_concurrency threads, in completion order.
+
+        Items are submitted in order, never more than the worker count ahead of
+        the consumer. If may_submit is given it is asked before each submission;
+        once it returns False, the remaining items are not run or yielded.
+        """
+        may_submit = may_submit or (lambda: True)
+        max_workers = min(self.ranking_concurrency, len(items))
+        if max_workers <= 1:
+            for index, item in enumerate(items):
+                if not may_submit():
+                    return
+                yield index, fn(item)
+            return
+
+        logger.info(f"Running up to {len(items)} Gemini ranking calls with {max_workers} workers.")
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-ranker")
+        try:
+            pending = {}
+            next_index = 0
+            while True:
+                while next_index < len(items) and len(pending) < max_workers and may_submit():
+                    # Run in a copy of this context so workers report metrics for the current stage and request
+                    pending[executor.submit(contextvars.copy_context().run, fn, items[next_index])] = next_index
+                    next_index += 1
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+        finally:
+            # Do not block on (or keep paying for) pending calls if the consumer stops early
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run_concurrently(self, fn: Callable, items: List) -> List:
+        """Map fn over items with up to ranking_concurrency threads, preserving input order"""
+        results = [None] * len(items)
+        for index, result in self._iter_concurrently(fn, items):
+            results[index] = result
+        return results
+
+    def match_resume_to_jobs(self, resume_data: Dict, resume_summary: str, job_listings: List[Dict],
+                             features: Optional[ResumeFeatures] = None) -> List[Dict]:
+        """Match resume to job listings using Gemini. Pass features to reuse an already computed bundle."""
+        ranked = sorted(self._iter_ranked_jobs(resume_data, resume_summary, job_listings, features),
+                        key=lambda item: item[0])
+        matched_jobs = [matched_job for _, matched_job in ranked]
+
+        # Sort by match score; ranking positions were restored above, so ties keep pre-score order
+        matched_jobs.sort(key=lambda x: x.get('match_details', {}).get('match_score', 0), reverse=True)
+        logger.info(f"Completed ranking. Found {len(matched_jobs)} suitable jobs.")
+        return matched_jobs
+
+    def iter_match_resume_to_jobs(self, resume_data: Dict, resume_summary: str, job_listings: List[Dict],
+                                  features: Optional[ResumeFeatures] = None) -> Iterator[Dict]:
+        """
+        Generator form of match_resume_to_jobs: yields each ranked job as soon as it is scored,
+        in completion order rather than score order.
+        """
+        for _, matched_job in self._iter_ranked_jobs(resume_data, resume_summary, job_listings, features):
+            yield matched_job
+
+    def _iter_ranked_jobs(self, resume_data: Dict, resume_summary: str, job_listings: List[Dict],
+                          features: Optional[ResumeFeatures] = None) -> Iterator[Tuple[int, Dict]]:
+        """Yield (ranking position, job with match_details) pairs as jobs finish ranking"""
         if not resume_data:
             logger.error("No resume data provided for matching")
-            return []
+            return
         
         if not job_listings:
             logger.warning("No job listings provided for matching")
-            return []
+            return
 
         # Stage 1 - Pre-filtering (removed location/job_preference filtering)
         pre_filtered_jobs = job_listings
 
-        # Stage 2 - Pre-scoring based on keyword similarity
-        keywords = self.extract_resume_keywords(resume_data)
-        logger.info(f"Extracted keywords from resume: {keywords}")
-        resume_skills_set = set(keywords)
-
-        for job in pre_filtered_jobs:
-            job_skills_set = set(job.get('skills_required', []))
-            intersection = len(resume_skills_set.intersection(job_skills_set))
-            union = len(resume_skills_set.union(job_skills_set))
-            jaccard_score = intersection / union if union > 0 else 0
-            job['pre_score'] = jaccard_score
-        
-        # Sort by pre-score and take top N for detailed analysis
-        pre_filtered_jobs.sort(key=lambda x: x.get('pre_score', 0), reverse=True)
-        jobs_to_rank = pre_filtered_jobs[:TOP_N_FOR_LLM]
-        logger.info(f"Selected top {len(jobs_to_rank)} jobs for detailed Gemini ranking.")
-
-        # Detailed matching prompt for Gemini
-        matching_prompt = PromptTemplate(
-            input_variables=["resume_details", "resume_summary", "job_listing", "keywords"],
-            template="""Analyze the compatibility between the resume and job listing. Focus on experience alignment, skill matches, and overall suitability.
-
-Resume Summary:
-{resume_summary}
-
-Key Resume Keywords: {keywords}
-
-Full Resume Details:
-{resume_details}
-
-Job Listing:
-{job_listing}
-
-Provide a detailed analysis and return ONLY a valid JSON object with this exact structure:
+        # Stage 2 - Pre-scoring by TF-IDF similarity or skill overlap
+        features = features or self.build_resume_features(resume_data, extract_keywords=self.ranking_mode != "local")
+
+        # Take top N by pre-score for detailed analysis
+        jobs_to_rank = [
+            {**pre_filtered_jobs[job_idx], 'pre_score': pre_score}
+            for job_idx, pre_score in self._select_candidates(resume_data, features, pre_filtered_jobs, Config.TOP_N_FOR_LLM)
+        ]
+        logger.info(f"Selected top {len(jobs_to_rank)} jobs for detailed ranking.")
+
+        keywords_text = features.keywords_text
+        resume_details = features.compact_resume
+
+        def build_prompt(job: Dict) -> str:
+            return MATCHING_PROMPT.format(
+                resume_details=resume_details,
+                resume_summary=resume_summary,
+                job_listing=compile_job(job),
+                keywords=keywords_text
+            )
 
-{{
-    "match_score": [integer between 0-100],
-    "matched_skills": [list of skills that match between resume and job],
-    "missing_skills": [list of required skills not present in resume],
-    "match_reasoning": "Detailed explanation of the match score focusing on experience alignment and skill compatibility",
-    "job_fit": "[Excellent Match|Good Match|Moderate Match|Poor Match]"
-}}
+        if self.ranking_mode == "local":
+            yield from enumerate(self._rank_jobs_locally(resume_data, features, jobs_to_rank, build_prompt))
+            return
+
+        # Only candidates with a useful pre-score go to Gemini; the rest are dropped. Those the
+        # scheduler stops short of only fill the results up to the top-k, with their local rubric score
+        scorer = LocalJobScorer(resume_data, features.keywords)
+        local_details = [scorer.score(job) for job in jobs_to_rank]
+        best_pre_score = jobs_to_rank[0]['pre_score'] if jobs_to_rank else 0
+        total = sum(1 for job in jobs_to_rank
+                    if job['pre_score'] > 0 and job['pre_score'] >= Config.RANKING_MIN_PRE_SCORE_RATIO * best_pre_score)
+        if total < len(jobs_to_rank):
+            logger.info(f"{len(jobs_to_rank) - total} candidates are below the pre-score cutoff, dropping them.")
+
+        ranked_positions = list(enumerate(jobs_to_rank[:total], 1))
+        if self.ranking_mode == "batched":
+            batch_size = self.ranking_batch_size
+            units = [ranked_positions[i:i + batch_size] for i in range(0, total, batch_size)]
+        else:
+            batch_size = 1
+            units = [[item] for item in ranked_positions]
+        scheduler = RankingScheduler(
+            estimates=[max(local_details[position - 1]['match_score'] for position, _ in unit) for unit in units],
+            top_k=Config.RANKING_TOP_K,
+            max_calls=Config.RANKING_MAX_LLM_CALLS,
+            time_budget=Config.RANKING_TIME_BUDGET_SECONDS,
+            patience=Config.RANKING_PATIENCE,
+            score_margin=Config.RANKING_SCORE_MARGIN,
+            available=get_llm_gateway().available
+        )
 
-Consider:
-- Work experience relevance (40% weight)
-- Technical skills alignment (30% weight)
-- Education/certifications (20% weight)
-- Soft skills and cultural fit (10% weight)
+        def rank(position: int, job: Dict) -> Dict:
+            # Failed or rejected calls keep the local rubric result
+            return self._rank_job(resume_data, job, build_prompt, position, total,
+                                  fallback=lambda _: local_details[position - 1])
 
-JSON Response:"""
-        )
+        def rank_locally(position: int, job: Dict) -> Dict:
+            return {**job, "match_details": self._finalize_match_details(local_details[position - 1], job, "local")}
 
-        matched_jobs = []
-        for i, job in enumerate(jobs_to_rank, 1):
-            try:
-                logger.info(f"Ranking job {i}/{len(jobs_to_rank)}: {job.get('job_title', 'Unknown Job')}")
-                
-                # Get match analysis from Gemini
-                match_result = self.llm.invoke(
-                    matching_prompt.format(
-                        resume_details=json.dumps(resume_data, indent=2),
-                        resume_summary=resume_summary,
-                        job_listing=json.dumps(job, indent=2),
-                        keywords=", ".join(keywords) if keywords else "None"
-                    )
+        if self.ranking_mode == "batched":
+            def build_batch_prompt(batch_listings: List[Tuple[str, Dict]]) -> str:
+                job_listings = ",\n".join(
+                    f'{{"job_id":{json.dumps(job_id)},"listing":{compile_job(job)}}}' for job_id, job in batch_listings
+                )
+                return BATCH_MATCHING_PROMPT.format(
+                    resume_details=resume_details,
+                    resume_summary=resume_summary,
+                    job_listings=f"[\n{job_listings}\n]",
+                    keywords=keywords_text
                 )
-                
-                if not match_result or not match_result.strip():
-                    logger.warning(f"Empty response from Gemini for job {i}, using fallback scoring")
-                    match_data = self._fallback_scoring(resume_data, job)
-                else:
-                    match_data = self._clean_json_response(match_result, expect_array=False)
-                    if not match_data:
-                        logger.warning(f"Failed to parse Gemini response for job {i}, using fallback scoring")
-                        match_data = self._fallback_scoring(resume_data, job)
-
-                # Validate and fix match score
-                match_score = match_data.get("match_score", 0)
-                if not isinstance(match_score, (int, float)) or not (0 <= match_score <= 100):
-                    matched_skills_count = len(match_data.get("matched_skills", []))
-                    required_skills_count = len(job.get("skills_required", []))
-                    match_score = int((matched_skills_count / required_skills_count) * 100) if required_skills_count > 0 else 0
-                    match_data["match_score"] = match_score
-
-                # Set job fit based on score
-                if match_score >= 80:
-                    match_data["job_fit"] = "Excellent Match"
-                elif match_score >= 60:
-                    match_data["job_fit"] = "Good Match"
-                elif match_score >= 40:
-                    match_data["job_fit"] = "Moderate Match"
-                else:
-                    match_data["job_fit"] = "Poor Match"
-                
-                # Ensure reasoning exists
-                if not match_data.get("match_reasoning"):
-                    match_data["match_reasoning"] = f"Score based on skill overlap and experience alignment."
-
-                matched_job = {**job, "match_details": match_data}
-                matched_jobs.append(matched_job)
-                
-            except Exception as e:
-                logger.error(f"Error ranking job {i}: {e}")
-                error_match_data = {
-                    "match_score": 0,
-                    "matched_skills": [],
-                    "missing_skills": [],
-                    "match_reasoning": f"Error during matching: {str(e)}",
-                    "job_fit": "Error"
-                }
-                matched_jobs.append({**job, "match_details": error_match_data})
-        
-        # Sort by match score
-        matched_jobs.sort(key=lambda x: x.get('match_details', {}).get('match_score', 0), reverse=True)
-        logger.info(f"Completed ranking. Found {len(matched_jobs)} suitable jobs.")
-        return matched_jobs
 
-    def generate_job_recommendations(self, resume_data: Dict) -> List[Dict]:
-        """Generate job recommendations based on resume data using Gemini"""
+            # Re-ranking a job missing from a reply is one more call: it needs the scheduler's go-ahead
+            rank_unit = lambda batch: self._rank_job_batch(batch, build_batch_prompt, rank, rank_locally,
+                                                           scheduler.may_issue_extra)
+        else:
+            rank_unit = lambda unit: [rank(*unit[0])]
+
+        ranked = set()
+        for unit_index, ranked_unit in self._iter_concurrently(rank_unit, units, scheduler.may_issue):
+            for offset, matched_job in enumerate(ranked_unit):
+                index = unit_index * batch_size + offset
+                scheduler.record(index, matched_job['match_details'].get('match_score', 0))
+                ranked.add(index)
+                yield index, matched_job
+
+        skipped = sorted((index for index in range(total) if index not in ranked),
+                         key=lambda index: local_details[index]['match_score'], reverse=True)
+        record_ranking_skip("below_cutoff", len(jobs_to_rank) - total)
+        record_ranking_skip("early_stop", len(skipped))
+        filled = skipped[:max(Config.RANKING_TOP_K - len(ranked), 0)]
+        for index in filled:
+            job = jobs_to_rank[index]
+            yield index, {**job, "match_details": self._finalize_match_details(local_details[index], job, "local")}
+        logger.info(f"Ranked {len(ranked)} jobs with {scheduler.calls} Gemini calls and {len(filled)} with the "
+                    f"local rubric; dropped {len(jobs_to_rank) - len(ranked) - len(filled)} candidates.")
+
+    def generate_job_recommendations(self, resume_data: Dict, features: Optional[ResumeFeatures] = None) -> List[Dict]:
+        """Generate job recommendations based on resume data using Gemini. Pass features to reuse an already computed bundle."""
         if not resume_data:
             logger.error("No resume data provided for job recommendation.")
             return []
 
         # Extract keywords for better prompting
-        keywords = self.extract_resume_keywords(resume_data)
-        logger.info(f"Extracted keywords for job recommendation: {keywords}")
-
-        recommendation_prompt = PromptTemplate(
-            input_variables=["resume_details", "keywords"],
-            template="""Based on the resume details and keywords provided, recommend the top 3 most suitable job roles for this candidate.
-
-Resume Details:
-{resume_details}
-
-Key Resume Keywords: {keywords}
-
-For each job role, provide:
-1. job_title: A specific job title based on the resume content
-2. match_score: Integer percentage (0-100) indicating profile fit
-3. suitability_reasoning: 2-3 sentences explaining why this role fits, referencing specific resume elements
-4. improvement_suggestions: 2-3 sentences of actionable advice to improve candidacy
-
-Return ONLY a valid JSON array of exactly 3 job recommendation objects. No additional text or formatting.
-
-Expected JSON format:
-[
-    {{
-        "job_title": "Specific Job Title",
-        "match_score": 85,
-        "suitability_reasoning": "Candidate has relevant experience in X and skills in Y, making them well-suited for this role.",
-        "improvement_suggestions": "Consider gaining experience in Z technology and developing stronger skills in W area."
-    }},
-    {{
-        "job_title": "Another Job Title",
-        "match_score": 78,
-        "suitability_reasoning": "Strong background in A and demonstrated competency in B align with role requirements.",
-        "improvement_suggestions": "Build portfolio projects showcasing C skills and pursue certification in D."
-    }},
-    {{
-        "job_title": "Third Job Title",
-        "match_score": 72,
-        "suitability_reasoning": "Educational background and project experience provide foundation for this career path.",
-        "improvement_suggestions": "Gain hands-on experience through internships and strengthen technical skills in E."
-    }}
-]
-
-JSON Array:"""
-        )
+        features = features or self.build_resume_features(resume_data)
 
         try:
             logger.info("Generating job recommendations using Gemini...")
             
-            response = self.llm.invoke(
-                recommendation_prompt.format(
-                    resume_details=json.dumps(resume_data, indent=2),
-                    keywords=", ".join(keywords) if keywords else "None"
+            response = self._invoke(
+                RECOMMENDATION_PROMPT.format(
+                    resume_details=features.compact_resume,
+                    keywords=features.keywords_text
                 )
             )
             
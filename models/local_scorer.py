@@ -0,0 +1,253 @@
+import re
+import json
+import logging
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+from models.resume_features import normalize_skill
+from models.job_index import parse_job_skills
+
+logger = logging.getLogger(__name__)
+
+# Same weights the Gemini matching prompt is asked to apply
+RUBRIC_WEIGHTS = {
+    "experience": 40,
+    "skills": 30,
+    "education": 20,
+    "soft_skills": 10
+}
+
+# Highest matching level wins, so more specific degrees are checked first. Abbreviations that are
+# also English words (ma, ba, be, bit, see) only count with their periods, next to "degree"/"in",
+# or in capitals
+DEGREE_LEVELS = [
+    (5, re.compile(r'ph\.?\s?d|doctor', re.I)),
+    (4, re.compile(r'master|\bm\.?\s?sc\b|\bmba\b|\bm\.?\s?tech\b|\bmca\b|\bm\.\s?a\b|\bma\s+(?:degree|in)\b'
+                   r'|post\s?-?graduate|graduate \(masters\)', re.I)),
+    (3, re.compile(r'bachelor|\bb\.?\s?sc\b|\bb\.\s?e\b|\bb\.?\s?tech\b|\bbba\b|\bbca\b|\bbbs\b|\bb\.\s?a\b'
+                   r'|\bba\s+(?:degree|in)\b|(?-i:\bBIT\b)|\bb\.?\s?s\b|under\s?-?graduate', re.I)),
+    (2, re.compile(r'diploma|certificate|associate', re.I)),
+    (1, re.compile(r'higher secondary|\+2|a levels?|high school|secondary|\bslc\b|(?-i:\bSEE\b)', re.I)),
+]
+SKILL_TOKEN = re.compile(r'[\w+#]+(?:\.[\w+#]+)*')
+
+MONTHS = {name: index for index, name in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], 1)}
+ONGOING_PATTERN = re.compile(r'present|current|now|ongoing|till date|to date', re.I)
+DATE_PATTERN = re.compile(r'(?:(?P<month_name>[a-z]{3})[a-z]*\.?\s+|(?P<month_num>\d{1,2})[/.-])?(?P<year>(?:19|20)\d{2})', re.I)
+RANGE_SEPARATOR = re.compile(r'\s*(?:-|–|—|\bto\b|\buntil\b)\s*', re.I)
+
+# Title words too generic to show that a past position relates to a job
+GENERIC_TITLE_TERMS = {'officer', 'manager', 'senior', 'junior', 'assistant', 'executive', 'intern', 'lead',
+                       'head', 'staff', 'associate', 'trainee', 'specialist', 'coordinator', 'and', 'for', 'the'}
+
+
+def education_level(text: str) -> int:
+    """Map a degree or education requirement to 0 (none) .. 5 (doctorate)"""
+    if not text:
+        return 0
+    for level, pattern in DEGREE_LEVELS:
+        if pattern.search(text):
+            return level
+    return 0
+
+
+def required_experience_years(text: str) -> float:
+    """Parse the jobs table's experience column, e.g. "More than 2 years" or "Not Required" """
+    if not text or re.search(r'not required', text, re.I):
+        return 0.0
+    if re.search(r'less than', text, re.I):
+        return 0.0
+    match = re.search(r'(\d+(?:\.\d+)?)', text)
+    return float(match.group(1)) if match else 0.0
+
+
+def _parse_month(endpoint: str, default_month: int) -> Optional[int]:
+    """Months since year 0 for one end of a date range, or None if it has no date"""
+    if ONGOING_PATTERN.search(endpoint):
+        today = date.today()
+        return today.year * 12 + today.month
+    match = DATE_PATTERN.search(endpoint)
+    if not match:
+        return None
+    month = default_month
+    if match.group('month_name') and match.group('month_name').lower() in MONTHS:
+        month = MONTHS[match.group('month_name').lower()]
+    elif match.group('month_num') and 1 <= int(match.group('month_num')) <= 12:
+        month = int(match.group('month_num'))
+    return int(match.group('year')) * 12 + month
+
+
+def _duration_interval(duration: str) -> Tuple[Optional[Tuple[int, int]], float]:
+    """
+    Return either a (start, end) month interval for a date range, or a length
+    in years for durations written as "2 years" / "6 months".
+    """
+    years = re.search(r'(\d+(?:\.\d+)?)\s*(?:years?|yrs?)', duration, re.I)
+    months = re.search(r'(\d+)\s*(?:months?|mos?)\b', duration, re.I)
+    if years or months:
+        return None, (float(years.group(1)) if years else 0.0) + (int(months.group(1)) / 12 if months else 0.0)
+
+    endpoints = RANGE_SEPARATOR.split(duration.strip(), maxsplit=1)
+    if len(endpoints) == 2:
+        start, end = _parse_month(endpoints[0], 6), _parse_month(endpoints[1], 6)
+        if start is not None and end is not None and end >= start:
+            return (start, end), 0.0
+    return None, 0.0
+
+
+def resume_experience_years(resume_data: Dict) -> float:
+    """Total years of work experience, merging overlapping date ranges"""
+    intervals = []
+    loose_years = 0.0
+    for experience in resume_data.get("Work Experience") or []:
+        if not isinstance(experience, dict) or not experience.get("Duration"):
+            continue
+        interval, years = _duration_interval(str(experience["Duration"]))
+        if interval:
+            intervals.append(interval)
+        loose_years += years
+
+    total_months = 0
+    current_start, current_end = None, None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total_months += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total_months += current_end - current_start
+
+    return round(total_months / 12 + loose_years, 1)
+
+
+def _token_phrase(skill: str) -> str:
+    """Skill tokens joined and padded with spaces ("Python/Django" -> " python django "), for whole-token tests"""
+    return " " + " ".join(SKILL_TOKEN.findall(skill.lower())) + " "
+
+
+def _job_requirements_text(job: Dict) -> str:
+    parts = []
+    for field in ('general_requirements', 'specific_requirements', 'responsibilities', 'dis'):
+        value = job.get(field)
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except json.JSONDecodeError:
+                pass
+        parts.append(" ".join(value) if isinstance(value, list) else str(value or ""))
+    return " ".join(parts).lower()
+
+
+class LocalJobScorer:
+    """
+    Deterministic, LLM-free implementation of the matching rubric.
+
+    Resume-side values (years of experience, degree level, skills) are parsed
+    once per resume; scoring a job is then a handful of set and regex
+    operations. Output follows the same match_details schema as Gemini ranking.
+    """
+
+    def __init__(self, resume_data: Dict, resume_skills: Iterable[str] = ()):
+        self.resume_data = resume_data
+        self.experience_years = resume_experience_years(resume_data)
+        self.education_level = max(
+            (education_level(" ".join(str(value) for value in entry.values()))
+             for entry in resume_data.get("Education") or [] if isinstance(entry, dict)),
+            default=0
+        )
+        skills = (list(resume_skills) + list(resume_data.get("Technical Skills") or [])
+                  + list(resume_data.get("Soft Skills") or []))
+        self.skills = {normalize_skill(skill) for skill in skills if isinstance(skill, str)}
+        self.skills.discard('')
+        # Each skill as space-separated tokens, to match job skills on token boundaries within one skill
+        self.skill_phrases = [_token_phrase(skill) for skill in self.skills]
+        self.soft_skills = {normalize_skill(skill) for skill in resume_data.get("Soft Skills") or [] if isinstance(skill, str)}
+        self.soft_skills.discard('')
+        self.positions = " ".join(
+            str(entry.get("Position") or "") for entry in resume_data.get("Work Experience") or [] if isinstance(entry, dict)
+        ).lower()
+
+    def _has_skill(self, skill: str) -> bool:
+        normalized = normalize_skill(skill)
+        if normalized in self.skills:
+            return True
+        phrase = _token_phrase(normalized)
+        return phrase.strip() != "" and any(phrase in resume_phrase for resume_phrase in self.skill_phrases)
+
+    def _title_relevant(self, job: Dict) -> bool:
+        """True if a distinctive word of the job title appears in the resume's positions"""
+        title_terms = set(re.findall(r'[a-z]{3,}', str(job.get('title') or '').lower())) - GENERIC_TITLE_TERMS
+        return any(term in self.positions for term in title_terms)
+
+    def _experience_score(self, job: Dict, relevant: bool) -> Tuple[float, str]:
+        required = required_experience_years(str(job.get('experience') or ''))
+        years_fit = 1.0 if required <= 0 else min(self.experience_years / required, 1.0)
+        score = 0.75 * years_fit + (0.25 if relevant else 0.0)
+        if required > 0:
+            detail = f"{self.experience_years:g} years of experience against {required:g} required"
+        else:
+            detail = "no minimum experience required"
+        if relevant:
+            detail += ", with directly related positions"
+        return score, detail
+
+    def _skills_score(self, job: Dict, title_relevant: bool) -> Tuple[float, List[str], List[str]]:
+        job_skills = parse_job_skills(job)
+        matched = [skill for skill in job_skills if self._has_skill(skill)]
+        missing = [skill for skill in job_skills if not self._has_skill(skill)]
+        if job_skills:
+            score = len(matched) / len(job_skills)
+        else:
+            score = 0.5 if title_relevant else 0.0
+        return score, matched, missing
+
+    def _education_score(self, job: Dict) -> Tuple[float, str]:
+        required = education_level(str(job.get('education') or ''))
+        if required == 0:
+            return 1.0, "no specific education required"
+        if self.education_level >= required:
+            return 1.0, "education meets the requirement"
+        if self.education_level == required - 1:
+            return 0.5, "education is one level below the requirement"
+        return 0.0, "education is below the requirement"
+
+    def _soft_skills_score(self, job: Dict) -> float:
+        if not self.soft_skills:
+            return 0.0
+        requirements = _job_requirements_text(job)
+        mentioned = [skill for skill in self.soft_skills if skill in requirements]
+        return 1.0 if mentioned else 0.5
+
+    def score(self, job: Dict) -> Dict:
+        title_relevant = self._title_relevant(job)
+        skills, matched_skills, missing_skills = self._skills_score(job, title_relevant)
+        if matched_skills or title_relevant:
+            experience, experience_detail = self._experience_score(job, title_relevant)
+            education, education_detail = self._education_score(job)
+            soft_skills = self._soft_skills_score(job)
+        else:
+            # Experience, education and soft skills only count towards a job the resume is relevant to:
+            # otherwise any posting without stated requirements would look like a moderate match
+            experience, education, soft_skills = 0.0, 0.0, 0.0
+            experience_detail, education_detail = "no skill or title overlap with the resume", None
+
+        breakdown = {
+            "experience": round(experience * RUBRIC_WEIGHTS["experience"], 1),
+            "skills": round(skills * RUBRIC_WEIGHTS["skills"], 1),
+            "education": round(education * RUBRIC_WEIGHTS["education"], 1),
+            "soft_skills": round(soft_skills * RUBRIC_WEIGHTS["soft_skills"], 1)
+        }
+        match_score = int(round(sum(breakdown.values())))
+
+        skills_detail = (f"{len(matched_skills)} of {len(matched_skills) + len(missing_skills)} listed skills matched"
+                         if matched_skills or missing_skills else "no skills listed for the job")
+        return {
+            "match_score": match_score,
+            "matched_skills": matched_skills,
+            "missing_skills": missing_skills,
+            "match_reasoning": "Local rubric score: "
+                               + "; ".join(filter(None, (experience_detail, skills_detail, education_detail))) + ".",
+            "score_breakdown": breakdown
+        }
@@ -0,0 +1,145 @@
+from langchain_core.prompts import PromptTemplate
+
+# Gemini prompts used by ResumeJobMatcher, parsed once at import instead of on every call
+
+# Skills, tools and technologies named in a resume
+KEYWORD_PROMPT = PromptTemplate(
+    input_variables=["resume_data"],
+    template="""Extract only the specific technical and soft skills, tools, and technologies explicitly mentioned in the provided resume data. Do not infer or add any skills, tools, or technologies that are not present in the resume.
+
+Focus on extracting:
+- Technical skills and programming languages
+- Software tools and technologies
+- Frameworks and libraries
+- Certifications and qualifications
+- Industry-specific terminology
+- Soft skills explicitly mentioned
+- Project technologies and methodologies
+
+Return ONLY a valid JSON array of strings containing the exact keywords found in the resume data. 
+
+Example format: ["Python", "Machine Learning", "SQL", "Project Management", "Communication"]
+
+If no keywords are found, return an empty array: []
+
+Resume Data:
+{resume_data}
+
+JSON Array:"""
+)
+
+# One resume against one job listing
+MATCHING_PROMPT = PromptTemplate(
+    input_variables=["resume_details", "resume_summary", "job_listing", "keywords"],
+    template="""Analyze the compatibility between the resume and job listing. Focus on experience alignment, skill matches, and overall suitability.
+
+Resume Summary:
+{resume_summary}
+
+Key Resume Keywords: {keywords}
+
+Full Resume Details:
+{resume_details}
+
+Job Listing:
+{job_listing}
+
+Provide a detailed analysis and return ONLY a valid JSON object with this exact structure:
+
+{{
+    "match_score": [integer between 0-100],
+    "matched_skills": [list of skills that match between resume and job],
+    "missing_skills": [list of required skills not present in resume],
+    "match_reasoning": "Detailed explanation of the match score focusing on experience alignment and skill compatibility",
+    "job_fit": "[Excellent Match|Good Match|Moderate Match|Poor Match]"
+}}
+
+Consider:
+- Work experience relevance (40% weight)
+- Technical skills alignment (30% weight)
+- Education/certifications (20% weight)
+- Soft skills and cultural fit (10% weight)
+
+JSON Response:"""
+)
+
+# One resume against several job listings, each identified by a job_id
+BATCH_MATCHING_PROMPT = PromptTemplate(
+    input_variables=["resume_details", "resume_summary", "job_listings", "keywords"],
+    template="""Analyze the compatibility between the resume and EACH of the job listings below. Focus on experience alignment, skill matches, and overall suitability. Score every job independently.
+
+Resume Summary:
+{resume_summary}
+
+Key Resume Keywords: {keywords}
+
+Full Resume Details:
+{resume_details}
+
+Job Listings (JSON array, each with a unique "job_id"):
+{job_listings}
+
+Return ONLY a valid JSON array with one object per job listing, using this exact structure:
+
+[
+    {{
+        "job_id": "[the job_id of the listing, copied exactly]",
+        "match_score": [integer between 0-100],
+        "matched_skills": [list of skills that match between resume and job],
+        "missing_skills": [list of required skills not present in resume],
+        "match_reasoning": "Detailed explanation of the match score focusing on experience alignment and skill compatibility",
+        "job_fit": "[Excellent Match|Good Match|Moderate Match|Poor Match]"
+    }}
+]
+
+Consider:
+- Work experience relevance (40% weight)
+- Technical skills alignment (30% weight)
+- Education/certifications (20% weight)
+- Soft skills and cultural fit (10% weight)
+
+JSON Array:"""
+)
+
+# Top 3 job roles for a resume
+RECOMMENDATION_PROMPT = PromptTemplate(
+    input_variables=["resume_details", "keywords"],
+    template="""Based on the resume details and keywords provided, recommend the top 3 most suitable job roles for this candidate.
+
+Resume Details:
+{resume_details}
+
+Key Resume Keywords: {keywords}
+
+For each job role, provide:
+1. job_title: A specific job title based on the resume content
+2. match_score: Integer percentage (0-100) indicating profile fit
+3. suitability_reasoning: 2-3 sentences explaining why this role fits, referencing specific resume elements
+4. improvement_suggestions: 2-3 sentences of actionable advice to improve candidacy
+
+Return ONLY a valid JSON array of exactly 3 job recommendation objects. No additional text or formatting.
+
+Expected JSON format:
+[
+    {{
+        "job_title": "Specific Job Title",
+        "match_score": 85,
+        "suitability_reasoning": "Candidate has relevant experience in X and skills in Y, making them well-suited for this role.",
+        "improvement_suggestions": "Consider gaining experience in Z technology and developing stronger skills in W area."
+    }},
+    {{
+        "job_title": "Another Job Title",
+        "match_score": 78,
+        "suitability_reasoning": "Strong background in A and demonstrated competency in B align with role requirements.",
+        "improvement_suggestions": "Build portfolio projects showcasing C skills and pursue certification in D."
+    }},
+    {{
+        "job_title": "Third Job Title",
+        "match_score": 72,
+        "suitability_reasoning": "Educational background and project experience provide foundation for this career path.",
+        "improvement_suggestions": "Gain hands-on experience through internships and strengthen technical skills in E."
+    }}
+]
+
+JSON Array:"""
+)
@@ -0,0 +1,111 @@
+import time
+import logging
+import threading
+from typing import Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RankingScheduler:
+    """
+    Decides how many Gemini ranking calls one request may issue.
+
+    Calls are issued in pre-score order, one unit (a job, or a batch of jobs)
+    at a time. Each unit carries an estimate, the best local rubric score of
+    its jobs. Issuing stops as soon as any of these holds:
+
+    - the per-request call budget or time budget is spent
+    - available() reports the API as degraded (the LLM gateway's circuit is open)
+    - the top-k is settled: k results are in and no remaining unit's estimate
+      plus score_margin can beat the current k-th score
+    - the top-k is stable: the last `patience` results left its membership unchanged
+
+    Calls already in flight are allowed to finish. A follow-up call outside the
+    unit order (re-ranking a job missing from a batched reply) must pass
+    may_issue_extra(), which applies the call budget, time budget and circuit
+    check and counts the call. Both may be called from worker threads.
+    """
+
+    def __init__(self, estimates: List[float], top_k: int, max_calls: int, time_budget: float,
+                 patience: int, score_margin: float, available: Optional[Callable[[], bool]] = None):
+        self.top_k = max(1, top_k)
+        self.max_calls = max_calls
+        self.patience = max(1, patience)
+        self.score_margin = score_margin
+        self.available = available
+        self.deadline = time.monotonic() + time_budget
+        self.calls = 0  # Gemini calls issued: units plus extra calls
+        self.issued = 0  # units issued
+        self.stop_reason: Optional[str] = None
+        self.scores: Dict[Hashable, float] = {}
+        self._top_keys = frozenset()
+        self._stable_results = 0
+        self._lock = threading.Lock()
+
+        # Best estimate among the units not yet issued, for every issue position
+        self._remaining_best = [float('-inf')] * (len(estimates) + 1)
+        for index in range(len(estimates) - 1, -1, -1):
+            self._remaining_best[index] = max(estimates[index], self._remaining_best[index + 1])
+        self._units = len(estimates)
+
+    def kth_score(self) -> Optional[float]:
+        if len(self.scores) < self.top_k:
+            return None
+        return sorted(self.scores.values(), reverse=True)[self.top_k - 1]
+
+    def _check_budget(self) -> Optional[str]:
+        if self.calls >= self.max_calls:
+            return f"call budget of {self.max_calls} reached"
+        if time.monotonic() >= self.deadline:
+            return "time budget exhausted"
+        if self.available is not None and not self.available():
+            return "Gemini circuit is open"
+        return None
+
+    def _check_stop(self) -> Optional[str]:
+        reason = self._check_budget()
+        if reason is not None:
+            return reason
+        kth_score = self.kth_score()
+        if kth_score is not None:
+            best_remaining = self._remaining_best[self.issued] + self.score_margin
+            if best_remaining < kth_score:
+                return f"no remaining candidate can beat the top-{self.top_k} cutoff of {kth_score:g}"
+            if self._stable_results >= self.patience:
+                return f"top-{self.top_k} unchanged for {self._stable_results} results"
+        return None
+
+    def may_issue(self) -> bool:
+        """Return True (and count the call) if the next unit should be sent to Gemini"""
+        with self._lock:
+            if self.stop_reason is not None or self.issued >= self._units:
+                return False
+            self.stop_reason = self._check_stop()
+            if self.stop_reason is not None:
+                logger.info(f"Stopping Gemini ranking after {self.issued} of {self._units} units "
+                            f"({self.calls} calls): {self.stop_reason}")
+                return False
+            self.issued += 1
+            self.calls += 1
+            return True
+
+    def may_issue_extra(self) -> bool:
+        """Return True (and count the call) if a follow-up call fits the call and time budgets and the circuit is closed"""
+        with self._lock:
+            reason = self._check_budget()
+            if reason is not None:
+                logger.info(f"Not issuing a follow-up Gemini call: {reason}")
+                return False
+            self.calls += 1
+            return True
+
+    def record(self, key: Hashable, score: float):
+        """Register a ranked job's match score and update the top-k stability count"""
+        with self._lock:
+            self.scores[key] = score
+            if len(self.scores) < self.top_k:
+                return
+            ranked = sorted(self.scores.items(), key=lambda item: item[1], reverse=True)
+            top_keys = frozenset(key for key, _ in ranked[:self.top_k])
+            self._stable_results = self._stable_results + 1 if top_keys == self._top_keys else 0
+            self._top_keys = top_keys
@@ -0,0 +1,55 @@
+import json
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List
+from utils.prompt_compiler import compile_resume
+
+
+def normalize_skill(skill: str) -> str:
+    """Lowercase a skill name and collapse whitespace so equal skills compare equal"""
+    return re.sub(r'\s+', ' ', str(skill)).strip().lower()
+
+
+def normalize_skills(skills: Iterable) -> FrozenSet[str]:
+    normalized = (normalize_skill(skill) for skill in skills if isinstance(skill, str))
+    return frozenset(skill for skill in normalized if skill)
+
+
+def resume_fingerprint(resume_data: Dict) -> str:
+    """Stable SHA-256 of the parsed resume, independent of key order"""
+    canonical = json.dumps(resume_data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+@dataclass(frozen=True)
+class ResumeFeatures:
+    """
+    Per-resume values shared by every matcher call for one upload.
+
+    Attributes:
+        fingerprint: SHA-256 of the parsed resume, used as the memoization key
+        keywords: Skills and technologies extracted from the resume by Gemini
+        normalized_skills: Lowercased keywords plus the resume's own skill lists
+        compact_resume: Field-pruned, budgeted resume JSON, ready to embed in prompts
+    """
+    fingerprint: str
+    keywords: List[str] = field(default_factory=list)
+    normalized_skills: FrozenSet[str] = frozenset()
+    compact_resume: str = ""
+
+    @property
+    def keywords_text(self) -> str:
+        return ", ".join(self.keywords) if self.keywords else "None"
+
+    @classmethod
+    def from_resume(cls, resume_data: Dict, keywords: List[str], fingerprint: str = None) -> "ResumeFeatures":
+        skills = list(keywords)
+        skills.extend(resume_data.get("Technical Skills") or [])
+        skills.extend(resume_data.get("Soft Skills") or [])
+        return cls(
+            fingerprint=fingerprint or resume_fingerprint(resume_data),
+            keywords=list(keywords),
+            normalized_skills=normalize_skills(skills),
+            compact_resume=compile_resume(resume_data)
+        )
@@ -0,0 +1,142 @@
+import re
+import json
+import logging
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+# Text columns of the jobs table that describe what a posting asks for
+JOB_TEXT_FIELDS = ('title', 'job_cat', 'skills', 'skills_required', 'general_requirements',
+                   'specific_requirements', 'responsibilities', 'dis')
+
+# Keeps tokens such as "c++", "c#", "node.js" and "ms-excel" intact
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#._-]*")
+
+
+def tokenize(text: str) -> List[str]:
+    return [token.rstrip('.-_') for token in TOKEN_PATTERN.findall(text.lower())]
+
+
+def _field_text(value) -> str:
+    """Flatten a job column to text; list columns are stored as JSON strings"""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            return value
+    if isinstance(value, list):
+        return " ".join(str(item) for item in value)
+    return str(value) if value else ""
+
+
+def job_text(job: Dict) -> str:
+    return " ".join(_field_text(job.get(field)) for field in JOB_TEXT_FIELDS)
+
+
+def resume_query_text(resume_data: Dict, keywords: Iterable[str]) -> str:
+    """Skills, job titles and project technologies from the resume, as retrieval query text"""
+    parts = list(keywords)
+    parts.extend(resume_data.get("Technical Skills") or [])
+    parts.extend(resume_data.get("Soft Skills") or [])
+    for experience in resume_data.get("Work Experience") or []:
+        if isinstance(experience, dict):
+            parts.append(experience.get("Position") or "")
+    for project in resume_data.get("Projects") or []:
+        if isinstance(project, dict):
+            parts.extend(project.get("Technologies") or [])
+    return " ".join(str(part) for part in parts if part)
+
+
+def _job_key(job: Dict, position: int) -> Tuple:
+    return (job.get('id', f"pos-{position}"), str(job.get('updated_at')))
+
+
+class TfidfJobRanker:
+    """
+    Sparse TF-IDF matrix over the job catalog's text fields.
+
+    Tokenized term counts are cached per job (keyed by id and updated_at) and
+    vocabulary ids are stable, so refitting after the catalog changes only
+    tokenizes new or updated postings; the matrix itself is reassembled from
+    the cached counts in one vectorized pass. Retrieval is a single sparse
+    matrix-vector product followed by argpartition.
+    """
+
+    def __init__(self):
+        self.vocabulary: Dict[str, int] = {}
+        self._term_counts: Dict[Tuple, Tuple[np.ndarray, np.ndarray]] = {}
+        self._keys: List[Tuple] = []
+        self._jobs: Optional[List[Dict]] = None  # the list last fitted, for the identity fast path
+        self.matrix = sparse.csr_matrix((0, 0))
+        self.idf = np.zeros(0)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _count_terms(self, job: Dict) -> Tuple[np.ndarray, np.ndarray]:
+        counts = Counter(tokenize(job_text(job)))
+        term_ids = np.fromiter((self.vocabulary.setdefault(term, len(self.vocabulary)) for term in counts),
+                               dtype=np.int32, count=len(counts))
+        return term_ids, np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+
+    def fit(self, jobs: List[Dict]) -> "TfidfJobRanker":
+        """Index the catalog, tokenizing only postings not seen in a previous fit"""
+        if jobs is self._jobs and len(jobs) == len(self._keys):
+            return self  # the job catalog's list, unchanged since the last fit
+        self._jobs = jobs
+        keys = [_job_key(job, position) for position, job in enumerate(jobs)]
+        if keys == self._keys:
+            return self
+
+        fresh = 0
+        term_counts = {}
+        for key, job in zip(keys, jobs):
+            cached = self._term_counts.get(key)
+            if cached is None:
+                cached = self._count_terms(job)
+                fresh += 1
+            term_counts[key] = cached
+        self._term_counts = term_counts
+        self._keys = keys
+
+        lengths = [len(term_counts[key][0]) for key in keys]
+        indptr = np.concatenate(([0], np.cumsum(lengths)))
+        if keys:
+            indices = np.concatenate([term_counts[key][0] for key in keys])
+            counts = np.concatenate([term_counts[key][1] for key in keys])
+        else:
+            indices, counts = np.zeros(0, dtype=np.int32), np.zeros(0)
+
+        # Sublinear tf, smoothed idf, L2-normalized rows (same weighting as sklearn's TfidfVectorizer)
+        tf = sparse.csr_matrix((1.0 + np.log(counts), indices, indptr), shape=(len(keys), len(self.vocabulary)))
+        doc_freq = np.bincount(indices, minlength=len(self.vocabulary))
+        self.idf = np.log((1.0 + len(keys)) / (1.0 + doc_freq)) + 1.0
+        weighted = tf @ sparse.diags(self.idf)
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        self.matrix = sparse.csr_matrix(sparse.diags(1.0 / norms) @ weighted)
+
+        logger.info(f"TF-IDF job index: {len(keys)} jobs ({fresh} newly tokenized), {len(self.vocabulary)} terms")
+        return self
+
+    def _query_vector(self, text: str) -> np.ndarray:
+        query = np.zeros(len(self.vocabulary))
+        for term, count in Counter(tokenize(text)).items():
+            term_id = self.vocabulary.get(term)
+            if term_id is not None and term_id < len(self.idf):
+                query[term_id] = (1.0 + np.log(count)) * self.idf[term_id]
+        norm = np.linalg.norm(query)
+        return query / norm if norm else query
+
+    def top_candidates(self, query_text: str, n: int) -> List[Tuple[int, float]]:
+        """Return up to n (job index, cosine score) pairs, best first"""
+        if not self._keys or n <= 0:
+            return []
+        scores = self.matrix @ self._query_vector(query_text)
+        n = min(n, len(scores))
+        top = np.argpartition(-scores, n - 1)[:n] if n < len(scores) else np.arange(len(scores))
+        top = top[np.lexsort((top, -scores[top]))]
+        return [(int(job_idx), float(scores[job_idx])) for job_idx in top]
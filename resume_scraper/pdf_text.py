@@ -0,0 +1,165 @@
+import io
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from pypdf import PdfReader
+from config import Config
+from utils.metrics import record_pdf_pages
+
+logger = logging.getLogger(__name__)
+
+# (page index, extracted text, seconds spent on the page)
+PageResult = Tuple[int, str, float]
+
+
+@dataclass
+class PdfText:
+    """
+    Text of a PDF and how it was obtained.
+
+    Attributes:
+        text: Page texts joined with newlines, cut to the character cap
+        total_pages: Pages in the document
+        page_seconds: Extraction time of each processed page, by page index
+        truncated: True if the page or character cap dropped part of the document
+        parallel: True if the pages were extracted in the process pool
+    """
+    text: str = ""
+    total_pages: int = 0
+    page_seconds: Dict[int, float] = field(default_factory=dict)
+    truncated: bool = False
+    parallel: bool = False
+
+    def timing_summary(self, slowest: int = 3) -> str:
+        pages = sorted(self.page_seconds.items(), key=lambda item: item[1], reverse=True)[:slowest]
+        slow = ", ".join(f"page {index + 1} {seconds * 1000:.0f} ms" for index, seconds in pages)
+        return (f"{len(self.page_seconds)}/{self.total_pages} pages, {len(self.text)} chars in "
+                f"{sum(self.page_seconds.values()):.2f}s of page time{' (parallel)' if self.parallel else ''}"
+                f"{'; slowest: ' + slow if slow else ''}")
+
+
+def _extract_pages(reader: PdfReader, indexes, max_chars: Optional[int] = None) -> List[PageResult]:
+    """Extract the given pages in order; with max_chars, stop once that much text is collected"""
+    results = []
+    collected = 0
+    for index in indexes:
+        started = time.perf_counter()
+        try:
+            text = reader.pages[index].extract_text() or ""
+        except Exception as page_e:
+            logger.warning(f"Could not extract text from page {index + 1}: {page_e}")
+            text = ""
+        results.append((index, text, time.perf_counter() - started))
+        collected += len(text)
+        if max_chars is not None and collected >= max_chars:
+            break
+    return results
+
+
+def _extract_page_range(pdf_bytes: bytes, start: int, stop: int) -> List[PageResult]:
+    """Process pool task: open the document in the worker and extract pages start..stop-1"""
+    return _extract_pages(PdfReader(io.BytesIO(pdf_bytes)), range(start, stop))
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the web workers are multi-threaded, and forking them can deadlock
+            _pool = ProcessPoolExecutor(max_workers=Config.PDF_EXTRACTION_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_parallel(pdf_bytes: bytes, page_count: int) -> Optional[List[PageResult]]:
+    """
+    Extract pages in contiguous ranges, one per pool worker. Ranges that miss the
+    deadline are left out; None means the pool is unusable and the caller should
+    extract in-process.
+    """
+    workers = Config.PDF_EXTRACTION_WORKERS
+    chunk = -(-page_count // workers)
+    pool = _get_pool()
+    try:
+        futures = [pool.submit(_extract_page_range, pdf_bytes, start, min(start + chunk, page_count))
+                   for start in range(0, page_count, chunk)]
+    except (BrokenProcessPool, RuntimeError) as e:
+        logger.warning(f"PDF extraction pool unavailable ({e}), extracting in-process")
+        _discard_pool(pool)
+        return None
+
+    deadline = time.monotonic() + Config.PDF_EXTRACTION_TIMEOUT_SECONDS
+    results = []
+    for future in futures:
+        try:
+            results.extend(future.result(timeout=max(0.0, deadline - time.monotonic())))
+        except FutureTimeoutError:
+            future.cancel()
+            logger.warning(f"PDF page range timed out after {Config.PDF_EXTRACTION_TIMEOUT_SECONDS:g}s, skipping it")
+        except BrokenProcessPool as e:
+            logger.warning(f"PDF extraction pool broke ({e}), extracting in-process")
+            _discard_pool(pool)
+            return None
+    return results
+
+
+def pdf_page_count(pdf_bytes: bytes) -> int:
+    """Pages in a PDF; raises if pypdf cannot open it"""
+    return len(PdfReader(io.BytesIO(pdf_bytes)).pages)
+
+
+def extract_pdf_text(source) -> PdfText:
+    """
+    Extract the text of a PDF given as bytes, a binary stream or a file path.
+
+    At most PDF_MAX_PAGES pages are read and the text is cut at PDF_MAX_CHARS.
+    Documents with PDF_PARALLEL_MIN_PAGES or more pages are extracted in a
+    process pool; smaller ones in-process, stopping at the character cap.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        pdf_bytes = bytes(source)
+    elif hasattr(source, "read"):
+        source.seek(0)
+        pdf_bytes = source.read()
+    else:
+        with open(source, "rb") as pdf_file:
+            pdf_bytes = pdf_file.read()
+
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    result = PdfText(total_pages=len(reader.pages))
+    page_count = min(result.total_pages, Config.PDF_MAX_PAGES)
+
+    pages = None
+    if page_count >= Config.PDF_PARALLEL_MIN_PAGES and Config.PDF_EXTRACTION_WORKERS > 1:
+        pages = _extract_parallel(pdf_bytes, page_count)
+        result.parallel = pages is not None
+    if pages is None:
+        pages = _extract_pages(reader, range(page_count), Config.PDF_MAX_CHARS)
+    pages.sort(key=lambda page: page[0])
+
+    # Join once: repeated string concatenation is quadratic in the document length
+    text = "\n".join(page_text for _, page_text, _ in pages)
+    result.text = text[:Config.PDF_MAX_CHARS]
+    result.page_seconds = {index: seconds for index, _, seconds in pages}
+    result.truncated = len(pages) < result.total_pages or len(text) > Config.PDF_MAX_CHARS
+    record_pdf_pages(result.page_seconds.values())
+    logger.info(f"Extracted PDF text: {result.timing_summary()}"
+                f"{' (truncated by the page/character caps)' if result.truncated else ''}")
+    return result
@@ -1,12 +1,20 @@
 
 # resume_praser.py
-import google.generativeai as genai
 import os
 import json
-import re
 import logging
-from pypdf import PdfReader
-from typing import List
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from utils.cache import cached_llm_call
+from utils.llm_gateway import get_llm_gateway
+from utils.llm_clients import get_client_provider
+from config import Config
+from utils.prompt_compiler import compile_resume, fit_text
+from utils.json_extract import extract_json
+from utils.metrics import record_fallback, timed_stage
+from resume_scraper.pdf_text import extract_pdf_text, pdf_page_count
+from models.resume_features import resume_fingerprint
 
 logging.basicConfig(
     level=logging.INFO,
@@ -16,77 +24,19 @@ logger = logging.getLogger(__name__)
 
 api_key = os.getenv("GEMINI_API_KEY")
 
-if not api_key:
+if not api_key and Config.LLM_BACKEND != "replay":
     logger.error("API key is not found. Please set the GEMINI_API_KEY environment variable in your .env file or system environment.")
     # You might want to raise an exception or handle this more gracefully in production
     # For development, just logging might be enough, but the AI functions will fail.
     # raise ValueError("GEMINI_API_KEY is not set.")
-else:
-    genai.configure(api_key=api_key)
 
-def clean_json_response(text):
-    """
-    Cleans the AI response to extract valid JSON content.
-    Handles markdown code blocks and attempts to fix common JSON issues.
-    """
-    # Remove markdown code block fences
-    text = text.replace("```json", "").replace("```", "").strip()
-
-    # Remove invalid control characters that can break JSON parsing
-    text = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', text)
-
-    # Find the outermost JSON object or array
-    try:
-        # Prioritize finding a complete JSON object or array
-        match_obj = re.search(r'\{.*\}', text, re.DOTALL)
-        match_arr = re.search(r'\[.*\]', text, re.DOTALL)
-
-        json_str = ""
-        if match_obj and match_arr:
-            # Take the one that starts earlier
-            if match_obj.start() < match_arr.start():
-                json_str = match_obj.group(0)
-            else:
-                json_str = match_arr.group(0)
-        elif match_obj:
-            json_str = match_obj.group(0)
-        elif match_arr:
-            json_str = match_arr.group(0)
-        else:
-            logger.warning(f"No JSON object or array found in text: {text[:200]}...")
-            return text # Return original if no JSON structure found
-
-        # Attempt to balance braces/brackets - simple heuristic
-        if json_str.startswith('{'):
-            open_count = json_str.count('{')
-            close_count = json_str.count('}')
-            if open_count > close_count:
-                json_str += '}' * (open_count - close_count)
-        elif json_str.startswith('['):
-            open_count = json_str.count('[')
-            close_count = json_str.count(']')
-            if open_count > close_count:
-                json_str += ']' * (open_count - close_count)
-
-        return json_str
-    except Exception as e:
-        logger.error(f"Error during JSON cleaning: {e}, text: {text[:200]}...")
-        return text
+GEMINI_MODEL = Config.GEMINI_MODEL
+SUMMARY_FALLBACK = "Could not generate a summary for this resume."
+EMPTY_UPLOAD_ERROR = "The uploaded file is empty."
+UNREADABLE_PDF_ERROR = "Failed to extract text from your resume. Please ensure it's a readable PDF."
 
-def ats_extractor(resume_data_text):
-    """
-    Extracts ATS-friendly information from the resume data.
-    
-    Args:
-        resume_data_text (str): The resume data in string format.
-        
-    Returns:
-        dict: A dictionary containing extracted information.
-    """
-    prompt = """
-    You are an ATS (Applicant Tracking System) that reads resumes and extracts relevant information.
-    From the given resume data, extract the following information and return it in valid JSON format:
-    {
+# JSON layout of a parsed resume, shared by the ATS and the combined extraction prompts
+ATS_RESUME_SCHEMA = """    {
         "Full Name": "",
         "Email Address": "",
         "Phone Number": "",
@@ -120,9 +70,10 @@ def ats_extractor(resume_data_text):
         ],
         "Summary_or_Objective": ""
     }
-    
-    IMPORTANT:
-    1. Return ONLY valid JSON format (no surrounding text or markdown, no introductory or concluding sentences).
+"""
+
+# Formatting rules for the parsed resume
+ATS_RULES = """    1. Return ONLY valid JSON format (no surrounding text or markdown, no introductory or concluding sentences).
     2. Ensure all strings are properly escaped (e.g., double quotes, backslashes).
     3. Education should be an array of objects, each with Degree, Major, University, and Years.
     4. Work Experience should include company, position, duration (e.g., "Jan 2020 - Dec 2022"), and a brief description of responsibilities/achievements.
@@ -133,34 +84,145 @@ def ats_extractor(resume_data_text):
     9. If information is missing, use empty arrays, empty strings, or null as appropriate.
     10. Pay special attention to extracting all projects mentioned in the resume.
     """
+
+ATS_PROMPT = """
+    You are an ATS (Applicant Tracking System) that reads resumes and extracts relevant information.
+    From the given resume data, extract the following information and return it in valid JSON format:
+""" + ATS_RESUME_SCHEMA + """    
+    IMPORTANT:
+""" + ATS_RULES
+
+# One call for the parsed resume and everything derived from it (see extract_resume_profile)
+PROFILE_PROMPT = """
+    You are an ATS (Applicant Tracking System) and career advisor. Read the resume text below and return
+    a single valid JSON object with exactly these four keys:
+    - "resume": the information extracted from the resume, in the format shown below
+    - "summary": a concise, professional summary (around 3-5 sentences) that highlights the candidate's key qualifications, experience, and skills relevant for job applications
+    - "keywords": a JSON array of the specific technical and soft skills, tools, technologies, frameworks, certifications and project methodologies explicitly mentioned in the resume; do not infer or add any that are not present
+    - "career_interests": a JSON array of 3-5 broad job search keywords or categories inferred from the candidate's education, work experience, skills and projects (e.g. "Software Developer", "Data Analysis", "Customer Service", "Education", "Healthcare", "Admin Support")
+
+    Format of "resume":
+""" + ATS_RESUME_SCHEMA + """
+    IMPORTANT:
+""" + ATS_RULES
+
+def generate_text(prompt_text, model_name=GEMINI_MODEL):
+    """
+    Sends a single-turn prompt to Gemini and returns the response text.
+    Identical prompts are answered from the shared LLM response cache; other
+    calls go through the rate-limited, retrying LLM gateway.
+    """
+    def call():
+        model = get_client_provider().generative_model(model_name, Config.RESUME_GENERATION_PARAMS)
+        response = model.generate_content([
+            {"role": "user",
+             "parts": [prompt_text]}
+        ], request_options={"timeout": Config.LLM_TIMEOUT_SECONDS})
+        return response.text
+
+    gateway = get_llm_gateway()
+    return cached_llm_call(model_name, Config.RESUME_GENERATION_PARAMS, prompt_text, lambda: gateway.call(prompt_text, call))
+
+def clean_json_response(text):
+    """
+    Cleans the AI response to extract valid JSON content.
+    Returns the extracted JSON object or array as a string, or the original
+    text if none is found. Prefer utils.json_extract.extract_json, which
+    returns the parsed value directly.
+    """
+    parsed = extract_json(text)
+    if parsed is None:
+        logger.warning(f"No JSON object or array found in text: {text[:200]}...")
+        return text # Return original if no JSON structure found
+    return json.dumps(parsed)
+
+def ats_extractor(resume_data_text):
+    """
+    Extracts ATS-friendly information from the resume data.
     
-    model = genai.GenerativeModel("gemini-2.0-flash")
+    Args:
+        resume_data_text (str): The resume data in string format.
+        
+    Returns:
+        dict: A dictionary containing extracted information.
+    """
     
     try:
-        response = model.generate_content([
-            {"role": "user", 
-             "parts": [f"{prompt} \n\n Resume Text:\n {resume_data_text}"]}
-        ])
+        response_text = generate_text(f"{ATS_PROMPT} \n\n Resume Text:\n {fit_text(resume_data_text, 'ats')}")
         
-        cleaned_response_text = clean_json_response(response.text)
-        parsed_data = json.loads(cleaned_response_text)
+        parsed_data = extract_json(response_text, dict)
+        if parsed_data is None:
+            logger.error(f"No valid JSON object in ATS extractor response: {response_text[:500]}...")
+            record_fallback("invalid_json")
+            return {
+                "error": "JSON parsing failed: no valid JSON object in the model response",
+                "raw_response": response_text
+            }
         return parsed_data
         
-    except json.JSONDecodeError as je:
-        logger.error(f"JSON Decode Error in ATS extractor: {je}")
-        logger.error(f"Problematic JSON string: {cleaned_response_text[:500]}...")
-        return {
-            "error": f"JSON parsing failed: {je}",
-            "raw_response": response.text if 'response' in locals() else None,
-            "cleaned_response_attempt": cleaned_response_text if 'cleaned_response_text' in locals() else None
-        }
     except Exception as e:
         logger.error(f"General error in AI processing for ATS extractor: {str(e)}")
         return {
             "error": str(e),
-            "raw_response": response.text if 'response' in locals() else None
+            "raw_response": response_text if 'response_text' in locals() else None
         }
 
+def _string_list(value) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+def check_resume_profile(reply) -> Optional[Dict]:
+    """
+    Schema check of a combined extraction reply. The "resume" object is required;
+    a derived field of the wrong type is dropped, so its view falls back to its own call.
+    """
+    if not isinstance(reply, dict) or not isinstance(reply.get("resume"), dict) or not reply["resume"]:
+        return None
+    profile = {"resume": reply["resume"]}
+    if isinstance(reply.get("summary"), str) and reply["summary"].strip():
+        profile["summary"] = reply["summary"].strip()
+    for key in ("keywords", "career_interests"):
+        if _string_list(reply.get(key)):
+            profile[key] = reply[key]
+    missing = {"summary", "keywords", "career_interests"} - profile.keys()
+    if missing:
+        logger.warning(f"Combined extraction reply lacks valid {', '.join(sorted(missing))}")
+    return profile
+
+def extract_resume_profile(resume_data_text) -> Optional[Dict]:
+    """
+    Extracts the ATS resume JSON, a summary, keywords and career interests from
+    the resume text in one Gemini call. Returns None if the reply fails the schema check.
+    """
+    try:
+        response_text = generate_text(f"{PROFILE_PROMPT} \n\n Resume Text:\n {fit_text(resume_data_text, 'ats')}")
+    except Exception as e:
+        logger.error(f"General error in AI processing for combined resume extraction: {str(e)}")
+        return None
+    profile = check_resume_profile(extract_json(response_text, dict))
+    if profile is None:
+        logger.error(f"Combined extraction reply failed the schema check: {response_text[:500]}...")
+        record_fallback("invalid_json")
+    return profile
+
+# Derived fields of recent combined extractions, by fingerprint of the parsed resume
+_profiles = OrderedDict()
+_profiles_lock = threading.Lock()
+
+def remember_resume_profile(parsed_resume_data: dict, profile: Dict) -> None:
+    fingerprint = resume_fingerprint(parsed_resume_data)
+    with _profiles_lock:
+        _profiles[fingerprint] = profile
+        while len(_profiles) > Config.RESUME_FEATURES_MEMO_SIZE:
+            _profiles.popitem(last=False)
+
+def resume_profile_field(parsed_resume_data: dict, key: str):
+    """A field (summary, keywords, career_interests) of the combined extraction that produced this resume, or None"""
+    with _profiles_lock:
+        if not _profiles:
+            return None
+        profile = _profiles.get(resume_fingerprint(parsed_resume_data))
+    return profile.get(key) if profile else None
+
 def generate_resume_summary(parsed_resume_data: dict) -> str:
     """
     Generates a concise, human-readable summary from the parsed resume data.
@@ -171,6 +233,10 @@ def generate_resume_summary(parsed_resume_data: dict) -> str:
     Returns:
         str: A summary of the resume.
     """
+    summary_text = resume_profile_field(parsed_resume_data, "summary")
+    if summary_text:
+        return summary_text
+
     prompt = """
     Based on the following structured resume data, write a concise, professional summary (around 3-5 sentences) that highlights the candidate's key qualifications, experience, and skills relevant for job applications. Focus on their strongest assets and career focus.
 
@@ -180,19 +246,14 @@ def generate_resume_summary(parsed_resume_data: dict) -> str:
     Summary:
     """
     
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    
     try:
-        # Convert the dictionary to a pretty-printed JSON string for the prompt
-        resume_json_str = json.dumps(parsed_resume_data, indent=2)
+        # Convert the dictionary to a compact, field-pruned JSON string for the prompt
+        resume_json_str = compile_resume(parsed_resume_data, "summary")
         
-        response = model.generate_content([
-            {"role": "user", 
-             "parts": [prompt.format(resume_json=resume_json_str)]}
-        ])
+        response_text = generate_text(prompt.format(resume_json=resume_json_str))
         
         # The summary is expected to be plain text, not JSON
-        summary_text = response.text.strip()
+        summary_text = response_text.strip()
         
         # Remove any leading/trailing markdown characters if AI accidentally adds them
         if summary_text.startswith('```') and summary_text.endswith('```'):
@@ -202,7 +263,8 @@ def generate_resume_summary(parsed_resume_data: dict) -> str:
         
     except Exception as e:
         logger.error(f"Error generating resume summary: {str(e)}")
-        return "Could not generate a summary for this resume."
+        record_fallback("llm_error")
+        return SUMMARY_FALLBACK
 
 def infer_career_interests(parsed_resume_data: dict) -> List[str]:
     """
@@ -215,6 +277,10 @@ def infer_career_interests(parsed_resume_data: dict) -> List[str]:
     Returns:
         List[str]: A list of 3-5 general job search keywords/categories.
     """
+    inferred_interests = resume_profile_field(parsed_resume_data, "career_interests")
+    if inferred_interests:
+        return inferred_interests
+
     prompt = """
     Analyze the following structured resume data. Based on the candidate's education, work experience, technical skills, soft skills, and projects, infer 3-5 by key words(e.g., "Software Developer","Python", "Data", "A.I" "Markating", "Data Analysis", "Customer Service", "Education", "Healthcare", "Admin Support"). Return ONLY a valid JSON array of these keywords. Do not include any introductory or concluding text, or markdown code block fences.
 
@@ -224,90 +290,92 @@ def infer_career_interests(parsed_resume_data: dict) -> List[str]:
     Return: []
     """
     
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    
     try:
-        resume_json_str = json.dumps(parsed_resume_data, indent=2)
+        resume_json_str = compile_resume(parsed_resume_data, "interests")
         
-        response = model.generate_content([
-            {"role": "user", 
-             "parts": [prompt.format(resume_json=resume_json_str)]}
-        ])
+        response_text = generate_text(prompt.format(resume_json=resume_json_str))
         
-        cleaned_response = clean_json_response(response.text)
-        inferred_interests = json.loads(cleaned_response)
+        inferred_interests = extract_json(response_text, list)
         
         if isinstance(inferred_interests, list) and all(isinstance(item, str) for item in inferred_interests):
             logger.info(f"Inferred career interests: {inferred_interests}")
             return inferred_interests
         else:
             logger.warning(f"Unexpected format for inferred career interests: {inferred_interests}. Returning default.")
+            record_fallback("invalid_json")
             return ["IT", "Administration", "Sales", "Customer Service"] # Fallback generic interests
         
-    except json.JSONDecodeError as je:
-        logger.error(f"JSON Decode Error in infer_career_interests: {je}")
-        logger.error(f"Problematic JSON string for career interests: {cleaned_response[:500]}...")
-        return ["IT", "Administration", "Sales", "Customer Service"]
     except Exception as e:
         logger.error(f"General error in AI processing for infer_career_interests: {str(e)}")
+        record_fallback("llm_error")
         return ["IT", "Administration", "Sales", "Customer Service"] # Fallback
 
-UPLOAD_PATH = "uploads" # Matches app.config['UPLOAD_FOLDER'] in cli4.py
-os.makedirs(UPLOAD_PATH, exist_ok=True)
+def read_upload(file_object) -> bytes:
+    """Bytes of an upload given as bytes or a binary stream (a Flask FileStorage, an open file, a BytesIO)"""
+    if isinstance(file_object, (bytes, bytearray)):
+        return bytes(file_object)
+    # Rewind file_object to the beginning if it has already been read
+    if hasattr(file_object, "seek"):
+        file_object.seek(0)
+    return file_object.read()
 
-def save_file(file_object, filename="file.pdf"):
-    """Save uploaded file to disk"""
-    file_path = os.path.join(UPLOAD_PATH, filename)
+def check_upload(pdf_bytes: bytes) -> Optional[str]:
+    """
+    Cheap checks to run on an upload before queueing it: the error to reject it
+    with if it is empty or a PDF that pypdf cannot open, else None.
+    """
+    if not pdf_bytes:
+        return EMPTY_UPLOAD_ERROR
     try:
-        # Rewind file_object to the beginning if it has already been read
-        file_object.seek(0)
-        with open(file_path, "wb") as f:
-            f.write(file_object.read())
-        logger.info(f"File saved to: {file_path}")
-        return file_path
+        if pdf_page_count(pdf_bytes) > 0:
+            return None
     except Exception as e:
-        logger.error(f"Error saving file {filename}: {str(e)}")
-        return None
+        logger.warning(f"Uploaded resume is not a readable PDF: {str(e)}")
+    return UNREADABLE_PDF_ERROR
 
-def extract_text_from_pdf(file_path):
-    """Extracts all text from a PDF using pypdf"""
-    if not file_path or not os.path.exists(file_path):
-        logger.error(f"PDF file path is invalid or does not exist: {file_path}")
+def extract_text_from_pdf(source):
+    """
+    Extracts the text of a PDF using pypdf (capped, and parallel for long documents).
+    source is the PDF's bytes, a binary stream or a file path.
+    """
+    if isinstance(source, str) and not os.path.exists(source):
+        logger.error(f"PDF file path is invalid or does not exist: {source}")
         return None
     try:
-        reader = PdfReader(file_path)
-        data = ""
-        for page in reader.pages:
-            try:
-                data += page.extract_text() or ""
-            except Exception as page_e:
-                logger.warning(f"Could not extract text from a page: {page_e}")
-        return data
+        return extract_pdf_text(source).text
     except Exception as e:
-        logger.error(f"Error extracting text from PDF {file_path}: {str(e)}")
+        logger.error(f"Error extracting text from PDF: {str(e)}")
         return None
 
 def parse_resume_from_file(file_object):
-    """Parses a resume file and extracts structured data."""
+    """
+    Parses a resume and extracts structured data. file_object is the upload's
+    bytes or a binary stream; it is parsed in memory, without temporary files.
+    """
     logger.info("Starting resume parsing process.")
-    file_path = save_file(file_object)
-    if not file_path:
-        logger.error("Failed to save resume file for parsing.")
-        return {"error": "Failed to save file for processing."}
-
-    resume_text = extract_text_from_pdf(file_path)
-    # Ensure the file is removed after text extraction
     try:
-        os.remove(file_path)
-        logger.info(f"Temporarily saved file removed: {file_path}")
-    except OSError as e:
-        logger.warning(f"Error removing temporary file {file_path}: {e}")
+        pdf_bytes = read_upload(file_object)
+    except Exception as e:
+        logger.error(f"Error reading uploaded resume: {str(e)}")
+        return {"error": "Failed to read the uploaded file."}
+    if not pdf_bytes:
+        logger.error("Uploaded resume is empty.")
+        return {"error": EMPTY_UPLOAD_ERROR}
+
+    with timed_stage("pdf_extraction"):
+        resume_text = extract_text_from_pdf(pdf_bytes)
 
     if not resume_text:
         logger.error("Failed to extract text from resume.")
-        return {"error": "Failed to extract text from your resume. Please ensure it's a readable PDF."}
+        return {"error": UNREADABLE_PDF_ERROR}
 
-    parsed_data = ats_extractor(resume_text)
+    with timed_stage("ats_extraction"):
+        profile = extract_resume_profile(resume_text) if Config.RESUME_EXTRACTION_MODE == "combined" else None
+        if profile is not None:
+            parsed_data = profile["resume"]
+            remember_resume_profile(parsed_data, profile)
+        else:
+            parsed_data = ats_extractor(resume_text)
     if "error" in parsed_data:
         logger.error(f"ATS extractor reported an error: {parsed_data['error']}")
         return parsed_data
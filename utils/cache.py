@@ -0,0 +1,255 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional
+from config import Config
+from utils.metrics import record_cache_lookup, record_llm_call, register_callback
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteCache:
+    """
+    Small persistent key-value cache backed by a local SQLite file.
+
+    Entries expire after ttl_seconds and the least recently used entries are
+    evicted once the table grows past max_entries. Safe to share between
+    threads; WAL mode lets several gunicorn workers use the same file.
+    A hit only writes last_access back once it is TOUCH_INTERVAL seconds old,
+    so reads do not queue on the SQLite write lock.
+    """
+
+    EVICT_EVERY = 64  # writes between size-based eviction passes
+    TOUCH_INTERVAL = 60.0  # seconds; recency for LRU eviction is tracked at this resolution
+
+    def __init__(self, path: str, table: str = "cache", max_entries: int = 5000, ttl_seconds: Optional[int] = None):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value BLOB,
+                created_at REAL,
+                last_access REAL
+            )""")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_last_access ON {table}(last_access)")
+        self._conn.commit()
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, key: str):
+        """Return the cached value for key, or None on a miss"""
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    f"SELECT value, created_at, last_access FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None or self._is_expired(row[1], now):
+                    self.misses += 1
+                    record_cache_lookup(self.table, hit=False)
+                    return None
+                if now - row[2] >= self.TOUCH_INTERVAL:
+                    self._conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (now, key))
+                    self._conn.commit()
+                self.hits += 1
+                record_cache_lookup(self.table, hit=True)
+                return row[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Cache read failed for {self.table}: {e}")
+            return None
+
+    def set(self, key: str, value) -> None:
+        """Store value under key and periodically evict expired and least recently used entries"""
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, value, now, now)
+                )
+                self._writes += 1
+                if self._writes % self.EVICT_EVERY == 0:
+                    self._evict(now)
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache write failed for {self.table}: {e}")
+
+    def delete(self, key: str) -> None:
+        try:
+            with self._lock:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache delete failed for {self.table}: {e}")
+
+    def _evict(self, now: float) -> None:
+        if self.ttl_seconds is not None:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (now - self.ttl_seconds,))
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+            logger.info(f"Evicted {count - self.max_entries} entries from {self.table}")
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for this process plus the current entry count"""
+        with self._lock:
+            size = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": size
+        }
+
+
+def llm_cache_key(model_name: str, params: Dict, prompt: str) -> str:
+    """Content address of an LLM call: model, generation params and a hash of the prompt"""
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    payload = json.dumps({"model": model_name, "params": params, "prompt": prompt_hash}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[SQLiteCache]:
+    """Process-wide Gemini response cache, or None when disabled"""
+    global _llm_cache
+    if not Config.LLM_CACHE_ENABLED:
+        return None
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                try:
+                    _llm_cache = SQLiteCache(
+                        Config.LLM_CACHE_PATH,
+                        table="llm_responses",
+                        max_entries=Config.LLM_CACHE_MAX_ENTRIES,
+                        ttl_seconds=Config.LLM_CACHE_TTL_SECONDS
+                    )
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to open LLM cache at {Config.LLM_CACHE_PATH}: {e}")
+                    return None
+    return _llm_cache
+
+
+def cached_llm_call(model_name: str, params: Dict, prompt: str, call) -> str:
+    """
+    Return the cached response for this prompt, or run call() and cache its result.
+
+    Empty responses are not cached so a transient failure is retried next time.
+    """
+    cache = get_llm_cache()
+    if cache is None:
+        return call()
+
+    key = llm_cache_key(model_name, params, prompt)
+    cached = cache.get(key)
+    if cached is not None:
+        logger.debug(f"LLM cache hit for {model_name} ({key[:12]})")
+        record_llm_call("cache_hit")
+        return cached
+
+    response = call()
+    if response and response.strip():
+        cache.set(key, response)
+    return response
+
+
+# Bump when the parsed resume format or the prompts that derive the cached fields change;
+# entries written under another version are never read again and age out
+RESUME_CACHE_SCHEMA_VERSION = 1
+
+
+def upload_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class ParsedResumeCache:
+    """
+    Results derived from an uploaded resume file, keyed by the SHA-256 of its
+    bytes: the parsed resume plus the fields computed from it (summary,
+    interests, keywords). Each entry is one JSON document that grows as the
+    pipeline fills in fields.
+    """
+
+    def __init__(self, store: SQLiteCache, schema_version: int = RESUME_CACHE_SCHEMA_VERSION):
+        self.store = store
+        self.schema_version = schema_version
+
+    def _key(self, digest: str) -> str:
+        return f"v{self.schema_version}:{digest}"
+
+    def get(self, digest: str) -> Dict:
+        """Cached fields for this upload ({} on a miss)"""
+        value = self.store.get(self._key(digest))
+        if value is None:
+            return {}
+        try:
+            entry = json.loads(value)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Dropping unreadable parsed resume cache entry {digest[:12]}: {e}")
+            self.store.delete(self._key(digest))
+            return {}
+        return entry if isinstance(entry, dict) else {}
+
+    def update(self, digest: str, **fields) -> None:
+        """Merge fields into the entry for this upload"""
+        entry = self.get(digest)
+        entry.update(fields)
+        self.store.set(self._key(digest), json.dumps(entry, ensure_ascii=False))
+
+
+_resume_cache = None
+_resume_cache_lock = threading.Lock()
+
+
+def get_resume_cache() -> Optional[ParsedResumeCache]:
+    """Process-wide parsed resume cache, or None when disabled"""
+    global _resume_cache
+    if not Config.RESUME_CACHE_ENABLED:
+        return None
+    if _resume_cache is None:
+        with _resume_cache_lock:
+            if _resume_cache is None:
+                try:
+                    _resume_cache = ParsedResumeCache(SQLiteCache(
+                        Config.RESUME_CACHE_PATH,
+                        table="parsed_resumes",
+                        max_entries=Config.RESUME_CACHE_MAX_ENTRIES,
+                        ttl_seconds=Config.RESUME_CACHE_TTL_SECONDS
+                    ))
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to open parsed resume cache at {Config.RESUME_CACHE_PATH}: {e}")
+                    return None
+    return _resume_cache
+
+
+# The cache file is shared by all workers, so whichever worker answers the scrape can count it;
+# only a cache that is already open is reported, a metrics scrape should not create one
+register_callback("cvisionary_llm_cache_entries", "Entries in the LLM response cache",
+                  lambda: _llm_cache.stats()["entries"] if _llm_cache is not None else None)
@@ -1,8 +1,15 @@
 import os
+import time
+import uuid
 import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
 import psycopg2
 import psycopg2.extras
-import logging
+import psycopg2.pool
+from config import Config
+from utils.metrics import record_db_rows
 logger = logging.getLogger(__name__)
 def allowed_file(filename):
     """Check if the uploaded file has an allowed extension."""
@@ -10,56 +17,146 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def _connect_args():
+    """psycopg2.connect arguments: DATABASE_URL (Render provides this) or the individual DB_* variables"""
+    database_url = os.getenv('DATABASE_URL')
+    if database_url:
+        return (database_url,), {}
+    return (), dict(
+        host=os.getenv('DB_HOST', 'localhost'),
+        user=os.getenv('DB_USER', 'postgres'),
+        password=os.getenv('DB_PASSWORD', ''),
+        database=os.getenv('DB_NAME', 'jobs'),
+        port=int(os.getenv('DB_PORT', '5432'))
+    )
+
 def get_db_connection():
-    """Get PostgreSQL database connection with error handling"""
+    """
+    Open a new, unpooled PostgreSQL connection, for long-lived uses such as
+    LISTEN. Queries should borrow a pooled one with db_connection().
+    """
     try:
-        # Try DATABASE_URL first (Render provides this)
-        database_url = os.getenv('DATABASE_URL')
-        
-        if database_url:
-            conn = psycopg2.connect(database_url)
-        else:
-            # Fallback to individual environment variables
-            conn = psycopg2.connect(
-                host=os.getenv('DB_HOST', 'localhost'),
-                user=os.getenv('DB_USER', 'postgres'),
-                password=os.getenv('DB_PASSWORD', ''),
-                database=os.getenv('DB_NAME', 'jobs'),
-                port=int(os.getenv('DB_PORT', '5432'))
-            )
-        
-        return conn
+        args, kwargs = _connect_args()
+        return psycopg2.connect(*args, **kwargs)
     except psycopg2.Error as e:
         logging.error(f"Error connecting to PostgreSQL database: {e}")
         return None
 
+_pool = None
+_pool_pid = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+_last_used: Dict[int, float] = {}  # id(connection) -> monotonic time it was returned to the pool
+_inherited_pools = []  # pools copied from a parent process: kept open, closing them would end the parent's sessions
+
+def _get_pool() -> psycopg2.pool.ThreadedConnectionPool:
+    """Process-wide connection pool, created on first use (and again in a forked worker)"""
+    global _pool, _pool_pid, _pool_slots
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            if _pool is not None:
+                _inherited_pools.append(_pool)
+                _pool = None
+            args, kwargs = _connect_args()
+            _pool = psycopg2.pool.ThreadedConnectionPool(
+                Config.DB_POOL_MIN_CONNECTIONS, Config.DB_POOL_MAX_CONNECTIONS, *args, **kwargs
+            )
+            # ThreadedConnectionPool raises instead of waiting when it is exhausted
+            _pool_slots = threading.BoundedSemaphore(Config.DB_POOL_MAX_CONNECTIONS)
+            _pool_pid = os.getpid()
+            _last_used.clear()
+            logger.info(f"Opened PostgreSQL connection pool "
+                        f"({Config.DB_POOL_MIN_CONNECTIONS}-{Config.DB_POOL_MAX_CONNECTIONS} connections)")
+        return _pool
+
+def _checkout(pool):
+    """A pooled connection; one idle for more than DB_POOL_CHECK_IDLE_SECONDS is checked with SELECT 1 first"""
+    while True:
+        conn = pool.getconn()
+        last_used = _last_used.get(id(conn))
+        if not conn.closed and (last_used is None or time.monotonic() - last_used <= Config.DB_POOL_CHECK_IDLE_SECONDS):
+            return conn
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return conn
+        except psycopg2.Error as e:
+            # Dropped idle connections are replaced one by one; a new connection is not checked
+            logger.warning(f"Replacing a dead pooled database connection: {e}")
+            _last_used.pop(id(conn), None)
+            pool.putconn(conn, close=True)
+
+def _release(pool, conn):
+    if not conn.closed:
+        try:
+            conn.rollback()  # end the read transaction (and any server-side cursor) before reuse
+        except psycopg2.Error as e:
+            logger.warning(f"Closing a pooled database connection that failed to roll back: {e}")
+    pool.putconn(conn, close=conn.closed)
+    if conn.closed:  # broken, or beyond the DB_POOL_MIN_CONNECTIONS the pool keeps open
+        _last_used.pop(id(conn), None)
+    else:
+        _last_used[id(conn)] = time.monotonic()
+
+@contextmanager
+def db_connection():
+    """
+    Borrow a connection from the pool for the duration of the block. Waits up to
+    DB_POOL_TIMEOUT_SECONDS for a free one; raises psycopg2.Error if none can be had.
+    """
+    pool = _get_pool()
+    slots = _pool_slots
+    if not slots.acquire(timeout=Config.DB_POOL_TIMEOUT_SECONDS):
+        raise psycopg2.pool.PoolError(f"No database connection free after {Config.DB_POOL_TIMEOUT_SECONDS:g}s")
+    try:
+        conn = _checkout(pool)
+        try:
+            yield conn
+        finally:
+            _release(pool, conn)
+    finally:
+        slots.release()
+
+def iter_jobs_from_db(batch_size=None, updated_since=None) -> Iterator[List[Dict]]:
+    """
+    Yield jobs, newest first, in lists of up to batch_size (DB_STREAM_BATCH_SIZE)
+    read from a server-side cursor, so only one batch is in memory at a time.
+    With updated_since, only jobs updated at or after it. The pooled connection
+    is held until the generator is exhausted or closed; raises psycopg2.Error.
+    """
+    batch_size = batch_size or Config.DB_STREAM_BATCH_SIZE
+    with db_connection() as conn:
+        cur = conn.cursor(name=f"jobs_stream_{uuid.uuid4().hex}", cursor_factory=psycopg2.extras.RealDictCursor)
+        cur.itersize = batch_size
+        if updated_since is None:
+            cur.execute("SELECT * FROM jobs ORDER BY created_at DESC")
+        else:
+            cur.execute("SELECT * FROM jobs WHERE updated_at >= %s ORDER BY created_at DESC", (updated_since,))
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [dict(row) for row in rows]
+        cur.close()
+
 def get_jobs_from_db(limit=None):
     """Fetch jobs from PostgreSQL database"""
-    conn = get_db_connection()
-    if not conn:
-        return []
-    
     try:
-        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
         if limit:
-            cur.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT %s", (limit,))
+            with db_connection() as conn:
+                cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+                cur.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT %s", (limit,))
+                # Convert RealDictRow to regular dict for easier handling
+                jobs_list = [dict(job) for job in cur.fetchall()]
+                cur.close()
         else:
-            cur.execute("SELECT * FROM jobs ORDER BY created_at DESC")
-        
-        jobs = cur.fetchall()
-        
-        # Convert RealDictRow to regular dict for easier handling
-        jobs_list = [dict(job) for job in jobs]
-        
-        cur.close()
-        conn.close()
-        
+            jobs_list = [job for batch in iter_jobs_from_db() for job in batch]
+        record_db_rows("jobs", len(jobs_list))
         return jobs_list
     except psycopg2.Error as e:
         logging.error(f"Error fetching jobs from database: {e}")
-        if conn:
-            conn.close()
         return []
 
 def fetch_jobs_from_db(limit=None):
@@ -68,48 +165,38 @@ def fetch_jobs_from_db(limit=None):
 
 def search_jobs_in_db(keywords, limit=10):
     """Search for jobs in PostgreSQL database based on keywords"""
-    conn = get_db_connection()
-    if not conn:
-        return []
+    # Create search query with ILIKE for case-insensitive search
+    search_conditions = []
+    params = []
+    
+    for keyword in keywords:
+        search_conditions.append("""
+            (title ILIKE %s OR 
+             skills ILIKE %s OR 
+             general_requirements ILIKE %s OR 
+             specific_requirements ILIKE %s OR
+             responsibilities ILIKE %s)
+        """)
+        keyword_param = f'%{keyword}%'
+        params.extend([keyword_param] * 5)
+    
+    query = f"""
+        SELECT * FROM jobs 
+        WHERE {' OR '.join(search_conditions)}
+        ORDER BY created_at DESC
+        LIMIT %s
+    """
+    params.append(limit)
     
     try:
-        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
-        # Create search query with ILIKE for case-insensitive search
-        search_conditions = []
-        params = []
-        
-        for keyword in keywords:
-            search_conditions.append("""
-                (title ILIKE %s OR 
-                 skills ILIKE %s OR 
-                 general_requirements ILIKE %s OR 
-                 specific_requirements ILIKE %s OR
-                 responsibilities ILIKE %s)
-            """)
-            keyword_param = f'%{keyword}%'
-            params.extend([keyword_param] * 5)
-        
-        query = f"""
-            SELECT * FROM jobs 
-            WHERE {' OR '.join(search_conditions)}
-            ORDER BY created_at DESC
-            LIMIT %s
-        """
-        params.append(limit)
-        
-        cur.execute(query, params)
-        jobs = cur.fetchall()
-        
-        # Convert RealDictRow to regular dict
-        jobs_list = [dict(job) for job in jobs]
-        
-        cur.close()
-        conn.close()
-        
+        with db_connection() as conn:
+            cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            cur.execute(query, params)
+            # Convert RealDictRow to regular dict
+            jobs_list = [dict(job) for job in cur.fetchall()]
+            cur.close()
+        record_db_rows("jobs_search", len(jobs_list))
         return jobs_list
     except psycopg2.Error as e:
         logging.error(f"Error searching jobs in database: {e}")
-        if conn:
-            conn.close()
-        return []
\ No newline at end of file
+        return []
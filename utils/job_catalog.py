@@ -0,0 +1,195 @@
+import json
+import time
+import select
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+import psycopg2
+import psycopg2.extras
+from psycopg2 import sql
+from config import Config
+from utils.helpers import fetch_jobs_from_db, get_db_connection, iter_jobs_from_db
+from utils.metrics import record_db_rows, record_job_catalog_size
+from utils.prompt_compiler import JOB_JSON_FIELDS
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_DEBOUNCE_SECONDS = 1.0  # a scrape commits job by job; collect its notifications into one refresh
+
+
+def decode_job(row: Dict) -> Dict:
+    """A jobs row as a plain dict, with the JSON-encoded list columns decoded"""
+    job = dict(row)
+    for field in JOB_JSON_FIELDS:
+        if isinstance(job.get(field), str):
+            try:
+                job[field] = json.loads(job[field])
+            except json.JSONDecodeError:
+                pass
+    return job
+
+
+def _newest_first(job: Dict):
+    return job.get('created_at') or datetime.min, job.get('id') or 0
+
+
+class JobCatalog:
+    """
+    Process-wide in-memory copy of the jobs table, newest first.
+
+    The first call to jobs() loads every row; after that a watcher thread
+    fetches only the rows whose updated_at is at or after the newest one seen
+    (the watermark), every refresh_seconds or shortly after a NOTIFY on
+    notify_channel, and merges them by id. Deleted rows, and rows committed late
+    with an older timestamp, are picked up by the full reload every
+    full_reload_seconds (or at once for a DELETE notification).
+
+    Rows are decoded once when they are loaded. jobs() returns a shared list:
+    callers must not modify it or the job dicts in it.
+    """
+
+    def __init__(self, refresh_seconds: float, full_reload_seconds: float, notify_channel: str = ""):
+        self.refresh_seconds = refresh_seconds
+        self.full_reload_seconds = full_reload_seconds
+        self.notify_channel = notify_channel
+        self._jobs: List[Dict] = []
+        self._by_id: Dict[int, Dict] = {}
+        self._watermark: Optional[datetime] = None
+        self._loaded = False
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._watcher = None
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def jobs(self) -> List[Dict]:
+        if not self._loaded:
+            self.refresh()
+            self._start_watcher()
+        return self._jobs
+
+    def refresh(self, full: bool = False) -> None:
+        """Pull changed rows into the catalog; a full reload on first use, on request or when one is due"""
+        with self._lock:
+            full = (full or not self._loaded or self._watermark is None
+                    or time.monotonic() - self._loaded_at >= self.full_reload_seconds)
+            jobs = []
+            try:
+                # Decoded batch by batch: the raw rows of the whole table are never held at once
+                for batch in iter_jobs_from_db(updated_since=None if full else self._watermark):
+                    jobs.extend(decode_job(row) for row in batch)
+            except psycopg2.Error as e:
+                logger.error(f"Error refreshing the job catalog: {e}")
+                return
+
+            if full:
+                record_db_rows("jobs_catalog_full", len(jobs))
+                self._load(jobs)
+            else:
+                record_db_rows("jobs_catalog_delta", len(jobs))
+                self._merge(jobs)
+
+    def _load(self, jobs: List[Dict]) -> None:
+        self._by_id = {job['id']: job for job in jobs}
+        self._jobs = jobs
+        self._watermark = max((job['updated_at'] for job in jobs if job.get('updated_at')), default=None)
+        self._loaded = True
+        self._loaded_at = time.monotonic()
+        record_job_catalog_size(len(jobs))
+        logger.info(f"Loaded job catalog: {len(jobs)} jobs")
+
+    def _merge(self, jobs: List[Dict]) -> None:
+        # updated_at >= watermark returns the newest rows again; only rows that changed are replaced
+        changed = [job for job in jobs
+                   if job['id'] not in self._by_id or self._by_id[job['id']].get('updated_at') != job.get('updated_at')]
+        if not changed:
+            return
+        by_id = dict(self._by_id)
+        for job in changed:
+            by_id[job['id']] = job
+            if job.get('updated_at') and (self._watermark is None or job['updated_at'] > self._watermark):
+                self._watermark = job['updated_at']
+        self._by_id = by_id
+        self._jobs = sorted(by_id.values(), key=_newest_first, reverse=True)  # swapped in whole: readers never see a partial list
+        record_job_catalog_size(len(self._jobs))
+        logger.info(f"Refreshed job catalog: {len(changed)} new or updated jobs, {len(self._jobs)} in total")
+
+    def _start_watcher(self) -> None:
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name="job-catalog", daemon=True)
+                self._watcher.start()
+
+    def _listen(self):
+        """A dedicated connection LISTENing on notify_channel, or None"""
+        conn = get_db_connection()
+        if not conn:
+            return None
+        try:
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            # Quoted, so the name matches the scraper's pg_notify() exactly (unquoted names are lowercased)
+            conn.cursor().execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.notify_channel)))
+            logger.info(f"Job catalog listening for changes on '{self.notify_channel}'")
+            return conn
+        except psycopg2.Error as e:
+            logger.warning(f"Could not LISTEN on '{self.notify_channel}', refreshing on the timer only: {e}")
+            conn.close()
+            return None
+
+    def _wait_for_notifications(self, conn, timeout: float) -> List[str]:
+        """Payloads of the notifications received within timeout (empty on timeout)"""
+        if not select.select([conn], [], [], timeout)[0]:
+            return []
+        time.sleep(NOTIFY_DEBOUNCE_SECONDS)
+        conn.poll()
+        payloads = [notify.payload for notify in conn.notifies]
+        conn.notifies.clear()
+        return payloads
+
+    def _watch(self) -> None:
+        listen_conn = None
+        while True:
+            payloads = []
+            if self.notify_channel and listen_conn is None:
+                listen_conn = self._listen()
+            if listen_conn is not None:
+                try:
+                    payloads = self._wait_for_notifications(listen_conn, self.refresh_seconds)
+                except (psycopg2.Error, OSError, ValueError) as e:
+                    logger.warning(f"Job catalog lost its LISTEN connection: {e}")
+                    listen_conn.close()
+                    listen_conn = None
+                    time.sleep(self.refresh_seconds)
+            else:
+                time.sleep(self.refresh_seconds)
+            try:
+                self.refresh(full="DELETE" in payloads)
+            except Exception as e:
+                logger.error(f"Unexpected error refreshing the job catalog: {e}")
+
+
+_job_catalog = None
+_job_catalog_lock = threading.Lock()
+
+
+def get_job_catalog() -> JobCatalog:
+    global _job_catalog
+    if _job_catalog is None:
+        with _job_catalog_lock:
+            if _job_catalog is None:
+                _job_catalog = JobCatalog(
+                    refresh_seconds=Config.JOB_CATALOG_REFRESH_SECONDS,
+                    full_reload_seconds=Config.JOB_CATALOG_FULL_RELOAD_SECONDS,
+                    notify_channel=Config.JOB_CATALOG_NOTIFY_CHANNEL
+                )
+    return _job_catalog
+
+
+def get_catalog_jobs() -> List[Dict]:
+    """Jobs to match uploads against: from the in-memory catalog, or straight from the DB when it is disabled"""
+    if not Config.JOB_CATALOG_ENABLED:
+        return fetch_jobs_from_db()
+    return get_job_catalog().jobs()
+
@@ -0,0 +1,226 @@
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from config import Config
+from utils.cache import SQLiteCache
+from utils.metrics import record_pipeline_job_state
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    """Raised by submit() when PIPELINE_MAX_PENDING uploads are already queued or running"""
+
+
+class JobStatusStore:
+    """
+    Status of upload jobs by id, as JSON in a SQLite table shared by all workers
+    on the host: a poll that reaches another worker than the one running the
+    job still finds it. Entries expire PIPELINE_JOB_RETENTION_SECONDS after
+    their last update.
+    """
+
+    def __init__(self, store: SQLiteCache):
+        self.store = store
+
+    def save(self, status: Dict) -> None:
+        self.store.set(status["job_id"], json.dumps(status, separators=(",", ":")))
+
+    def load(self, job_id: str) -> Optional[Dict]:
+        value = self.store.get(job_id)
+        if value is None:
+            return None
+        try:
+            return json.loads(value)
+        except ValueError as e:
+            logger.warning(f"Dropping unreadable status of job {job_id}: {e}")
+            self.store.delete(job_id)
+            return None
+
+
+class PipelineJob:
+    """
+    One queued upload. The worker publishes the pipeline's (event, data) tuples
+    to it; pollers read status(), streamers follow the events with wait_events().
+    Every state, stage or progress change is also written to the status store,
+    if there is one. The results themselves are stored by the worker (see
+    utils.results_store).
+    """
+
+    def __init__(self, job_id: str, status_store: Optional[JobStatusStore] = None):
+        self.id = job_id
+        self.status_store = status_store
+        self.state = "queued"  # queued -> running -> done | error
+        self.stage = None
+        self.jobs_ranked = 0
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.events: List[Tuple[str, object]] = []
+        self._cond = threading.Condition()
+        record_pipeline_job_state(None, self.state)
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ("done", "error")
+
+    def _update(self, event: str, data, state: Optional[str] = None) -> None:
+        with self._cond:
+            if state:
+                record_pipeline_job_state(self.state, state)
+                self.state = state
+            self.events.append((event, data))
+            self.updated_at = time.time()
+            self._cond.notify_all()
+        self.save_status()
+
+    def save_status(self) -> None:
+        """Write status() to the status store, outside the lock: the store is a SQLite file shared with other workers"""
+        if self.status_store is not None:
+            self.status_store.save(self.status())
+
+    def start(self) -> None:
+        with self._cond:
+            record_pipeline_job_state(self.state, "running")
+            self.state = "running"
+            self.updated_at = time.time()
+        self.save_status()
+
+    def publish(self, event: str, data) -> None:
+        if event == "job":
+            self.jobs_ranked += 1
+        else:
+            self.stage = event
+        self._update(event, data)
+
+    def finish(self, done_event: Dict) -> None:
+        self._update("done", done_event, state="done")
+
+    def fail(self, error: str) -> None:
+        self.error = error
+        self._update("error", {"error": error}, state="error")
+
+    def wait_events(self, cursor: int, timeout: float) -> List[Tuple[str, object]]:
+        """Events after the first cursor ones, waiting up to timeout for new ones"""
+        with self._cond:
+            if len(self.events) <= cursor and not self.finished:
+                self._cond.wait(timeout)
+            return self.events[cursor:]
+
+    def status(self) -> Dict:
+        with self._cond:
+            status = {
+                "job_id": self.id,
+                "state": self.state,
+                "stage": self.stage,
+                "jobs_ranked": self.jobs_ranked,
+                "created_at": self.created_at,
+                "updated_at": self.updated_at
+            }
+            if self.state == "error":
+                status["error"] = self.error
+            return status
+
+
+class PipelineJobQueue:
+    """
+    Runs upload pipelines on a fixed pool of worker threads, so the number of
+    uploads doing Gemini work at once is bounded here rather than by the number
+    of web threads. At most max_pending jobs are queued or running; finished
+    jobs are kept for retention_seconds so clients can collect their results.
+    """
+
+    def __init__(self, workers: int, max_pending: int, retention_seconds: float,
+                 status_store: Optional[JobStatusStore] = None):
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        self.status_store = status_store
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipeline")
+        self._jobs: "OrderedDict[str, PipelineJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        while self._jobs:
+            job = next(iter(self._jobs.values()))
+            if not job.finished or now - job.updated_at < self.retention_seconds:
+                break
+            self._jobs.popitem(last=False)
+            record_pipeline_job_state(job.state, None)
+
+    def submit(self, fn: Callable[[PipelineJob], None]) -> PipelineJob:
+        """Queue fn(job) and return the job; raises JobQueueFull when the queue is at capacity"""
+        with self._lock:
+            self._prune(time.time())
+            if sum(1 for job in self._jobs.values() if not job.finished) >= self.max_pending:
+                raise JobQueueFull(f"{self.max_pending} uploads are already being processed")
+            job = PipelineJob(uuid.uuid4().hex, self.status_store)
+            self._jobs[job.id] = job
+        job.save_status()
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job: PipelineJob, fn: Callable[[PipelineJob], None]) -> None:
+        job.start()
+        try:
+            fn(job)
+        except Exception as e:
+            logger.exception(f"Pipeline job {job.id} failed")
+            job.fail(f"An unexpected error occurred: {str(e)}.")
+        if not job.finished:
+            job.fail("Processing ended without a result.")
+
+    def get(self, job_id: str) -> Optional[PipelineJob]:
+        """A job held by this process's queue"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """Status of a job queued by any worker on the host, or None if it is unknown or expired"""
+        job = self.get(job_id)
+        if job is not None:
+            return job.status()
+        if self.status_store is not None:
+            return self.status_store.load(job_id)
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = {"queued": 0, "running": 0, "done": 0, "error": 0}
+            for job in self._jobs.values():
+                counts[job.state] += 1
+            return counts
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> PipelineJobQueue:
+    """Process-wide upload pipeline queue"""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                try:
+                    store = SQLiteCache(Config.PIPELINE_STATUS_PATH, table="pipeline_jobs",
+                                        max_entries=Config.PIPELINE_STATUS_MAX_ENTRIES,
+                                        ttl_seconds=Config.PIPELINE_JOB_RETENTION_SECONDS)
+                    status_store = JobStatusStore(store)
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to open pipeline job status store at {Config.PIPELINE_STATUS_PATH}, "
+                                 f"job status will only be known to the worker running the job: {e}")
+                    status_store = None
+                _job_queue = PipelineJobQueue(
+                    workers=Config.PIPELINE_WORKERS,
+                    max_pending=Config.PIPELINE_MAX_PENDING,
+                    retention_seconds=Config.PIPELINE_JOB_RETENTION_SECONDS,
+                    status_store=status_store
+                )
+    return _job_queue
+
@@ -0,0 +1,174 @@
+import re
+import json
+import logging
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+OPENERS = {'{': '}', '[': ']'}
+CLOSERS = {'}', ']'}
+STRUCTURAL_CHARS = re.compile(r'["\\{}\[\]]')
+PYTHON_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+
+# Parse attempts on nested candidates once the outermost ones have failed;
+# bounds the work on adversarial input to a constant number of linear passes
+MAX_NESTED_ATTEMPTS = 8
+
+
+def _find_candidates(text: str) -> Tuple[List[Tuple[int, int, int]], Optional[Tuple[int, str]]]:
+    """
+    Scan text once and return every balanced {...} / [...] span as
+    (start, end, depth), respecting JSON strings and escapes.
+
+    If the text ends inside an outermost bracket (a truncated reply), the
+    second value is (start, closing suffix) needed to balance it.
+    """
+    candidates = []
+    stack = []  # (opening index, expected closer)
+    in_string = False
+    escaped_index = -1  # position of the character escaped by the last backslash
+
+    # Only quotes, backslashes and brackets affect the scan, so jump between them
+    for match in STRUCTURAL_CHARS.finditer(text):
+        index, char = match.start(), match.group()
+        if in_string:
+            if index == escaped_index:
+                continue
+            if char == '\\':
+                escaped_index = index + 1
+            elif char == '"':
+                in_string = False
+            continue
+
+        if char == '"' and stack:
+            in_string = True
+        elif char in OPENERS:
+            stack.append((index, OPENERS[char]))
+        elif char in CLOSERS and stack:
+            if char == stack[-1][1]:
+                start, _ = stack.pop()
+                candidates.append((start, index + 1, len(stack)))
+            else:
+                # Mismatched closer: the current span cannot be valid, start over
+                stack.clear()
+
+    truncated = None
+    if stack:
+        suffix = ('"' if in_string else '') + ''.join(closer for _, closer in reversed(stack))
+        truncated = (stack[0][0], suffix)
+    return candidates, truncated
+
+
+def repair_json(candidate: str) -> str:
+    """
+    Fix common LLM JSON mistakes in one pass: trailing commas, unquoted keys
+    and Python literals (True/False/None). String contents are left untouched.
+    """
+    out = []
+    length = len(candidate)
+    index = 0
+    while index < length:
+        char = candidate[index]
+        if char == '"':
+            # Copy the whole string literal, including escapes
+            end = index + 1
+            while end < length and candidate[end] != '"':
+                end += 2 if candidate[end] == '\\' else 1
+            out.append(candidate[index:end + 1])
+            index = end + 1
+        elif char == ',':
+            # Drop the comma if only whitespace separates it from a closer
+            lookahead = index + 1
+            while lookahead < length and candidate[lookahead] in ' \t\r\n':
+                lookahead += 1
+            if lookahead < length and candidate[lookahead] in CLOSERS:
+                index = lookahead
+            else:
+                out.append(char)
+                index += 1
+        elif char.isalpha() or char == '_':
+            end = index + 1
+            while end < length and (candidate[end].isalnum() or candidate[end] == '_'):
+                end += 1
+            word = candidate[index:end]
+            lookahead = end
+            while lookahead < length and candidate[lookahead] in ' \t\r\n':
+                lookahead += 1
+            if lookahead < length and candidate[lookahead] == ':':
+                out.append(f'"{word}"')
+            else:
+                out.append(PYTHON_LITERALS.get(word, word))
+            index = end
+        else:
+            out.append(char)
+            index += 1
+    return ''.join(out)
+
+
+def _parse(candidate: str):
+    try:
+        return json.loads(candidate, strict=False)
+    except json.JSONDecodeError:
+        pass
+    try:
+        return json.loads(repair_json(candidate), strict=False)
+    except json.JSONDecodeError:
+        return None
+
+
+def _matches(value, expect: Optional[type]) -> bool:
+    if expect is None:
+        return isinstance(value, (dict, list))
+    return isinstance(value, expect)
+
+
+def extract_json(text: str, expect: Optional[type] = None, default=None):
+    """
+    Extract the first valid JSON object or array from an LLM response.
+
+    Markdown fences and surrounding prose are skipped by the bracket scanner,
+    so no regex backtracking is involved: finding candidates is a single
+    O(n) pass and each parse attempt is linear. Outermost spans are tried
+    first, then a bounded number of nested spans, then a truncated tail
+    closed with the missing brackets.
+
+    Args:
+        text: Raw model output
+        expect: dict or list to require a particular JSON type (default: either)
+        default: Returned when nothing parses
+
+    Returns:
+        The parsed value, or default.
+    """
+    if not text:
+        return default
+
+    candidates, truncated = _find_candidates(text)
+    outermost = [(start, end) for start, end, depth in candidates if depth == 0]
+    outermost.sort()
+    for start, end in outermost:
+        if text[start] in ('{' if expect is dict else '[' if expect is list else '{['):
+            value = _parse(text[start:end])
+            if value is not None and _matches(value, expect):
+                return value
+
+    nested = sorted((start, end) for start, end, depth in candidates if depth > 0)
+    attempts = 0
+    for start, end in nested:
+        if expect is not None and text[start] != ('{' if expect is dict else '['):
+            continue
+        attempts += 1
+        if attempts > MAX_NESTED_ATTEMPTS:
+            break
+        value = _parse(text[start:end])
+        if value is not None and _matches(value, expect):
+            return value
+
+    if truncated:
+        start, suffix = truncated
+        value = _parse(text[start:] + suffix)
+        if value is not None and _matches(value, expect):
+            logger.info("Recovered JSON from a truncated response by closing open brackets")
+            return value
+
+    return default
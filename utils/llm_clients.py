@@ -0,0 +1,82 @@
+import os
+import json
+import logging
+import threading
+from typing import Dict, Optional
+from config import Config
+from utils.llm_replay import make_generative_model, make_langchain_llm
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiClientProvider:
+    """
+    Process-wide Gemini clients, one per (model, generation settings).
+
+    Building a client imports the SDK, reads the credentials and sets up its
+    transport; the first request on it opens the connection, which later
+    requests reuse. Sharing the clients keeps all of that off the per-upload
+    path, and gives the resume parser and the job matcher one place for model
+    names, generation settings and timeouts.
+    """
+
+    def __init__(self):
+        self._clients: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: tuple, factory):
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = factory()
+                    self._clients[key] = client
+                    logger.info(f"Initialized Gemini client: {key[0]} {key[1]}")
+        return client
+
+    def generative_model(self, model_name: str = None, generation_params: Optional[Dict] = None):
+        """Shared genai.GenerativeModel (or its record/replay stand-in)"""
+        model_name = model_name or Config.GEMINI_MODEL
+        params = generation_params or None
+        key = ("genai", model_name, json.dumps(params, sort_keys=True))
+        return self._get(key, lambda: make_generative_model(model_name, generation_config=params))
+
+    def langchain_llm(self, model_name: str = None, generation_params: Optional[Dict] = None):
+        """Shared langchain GoogleGenerativeAI (or its record/replay stand-in)"""
+        model_name = model_name or Config.GEMINI_MODEL
+        params = dict(generation_params or {})
+        key = ("langchain", model_name, json.dumps(params, sort_keys=True))
+        return self._get(key, lambda: make_langchain_llm(
+            model_name,
+            google_api_key=os.getenv("GEMINI_API_KEY"),
+            timeout=Config.LLM_TIMEOUT_SECONDS,
+            max_retries=1,  # retries are handled by the LLM gateway
+            **params
+        ))
+
+    def warm_up(self) -> None:
+        """Build the clients the upload pipeline uses, so the first upload does not pay for it"""
+        try:
+            self.generative_model(Config.GEMINI_MODEL, Config.RESUME_GENERATION_PARAMS)
+            self.langchain_llm(Config.GEMINI_MODEL, Config.LLM_GENERATION_PARAMS)
+        except Exception as e:
+            logger.warning(f"Gemini client warm-up failed, clients will be created on first use: {e}")
+
+
+_client_provider = None
+_client_provider_lock = threading.Lock()
+
+
+def get_client_provider() -> GeminiClientProvider:
+    global _client_provider
+    if _client_provider is None:
+        with _client_provider_lock:
+            if _client_provider is None:
+                _client_provider = GeminiClientProvider()
+    return _client_provider
+
+
+def warm_up_clients_in_background() -> None:
+    """Warm the shared clients on a daemon thread, keeping them off the import path"""
+    threading.Thread(target=get_client_provider().warm_up, name="gemini-warm-up", daemon=True).start()
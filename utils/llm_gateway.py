@@ -0,0 +1,263 @@
+import re
+import time
+import random
+import logging
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Optional, Tuple
+from config import Config
+from utils.prompt_compiler import estimate_tokens
+from utils.metrics import record_circuit_open, record_llm_call
+
+logger = logging.getLogger(__name__)
+
+# gRPC status names of transient API problems (google.api_core errors also carry the HTTP code as .code)
+RETRYABLE_STATUS_NAMES = {"RESOURCE_EXHAUSTED", "UNAVAILABLE", "DEADLINE_EXCEEDED", "INTERNAL", "ABORTED"}
+# Error text that marks a transient API problem when neither the type nor a status code does
+RETRYABLE_MARKERS = ("resource exhausted", "resource_exhausted", "rate limit", "quota", "unavailable", "deadline",
+                     "timed out", "timeout", "overloaded")
+# An HTTP status leading the message ("503 Service Unavailable") or following "status", "code" or "HTTP";
+# a bare number elsewhere in the text (a token count, an id) is not one
+STATUS_IN_MESSAGE = re.compile(r'^\s*([45]\d\d)\b|\b(?:status(?: code)?|code|http)\W{0,3}([45]\d\d)\b', re.I)
+
+
+class LLMUnavailableError(Exception):
+    """Raised when a Gemini call is not attempted or gave up: circuit open, quota wait too long or retries exhausted"""
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    """HTTP status of an API error: .code (google.api_core), .status_code or .response.status_code (HTTP clients)"""
+    for value in (getattr(error, "code", None), getattr(error, "status_code", None),
+                  getattr(getattr(error, "response", None), "status_code", None)):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for rate limiting, timeouts and server-side errors; False for bad requests and auth errors"""
+    if isinstance(error, (TimeoutError, FutureTimeoutError, ConnectionError)):
+        return True
+    code = _status_code(error)
+    if code is not None:
+        return code == 429 or code >= 500
+    grpc_code = getattr(error, "code", None)
+    if callable(grpc_code):  # grpc.RpcError
+        try:
+            return getattr(grpc_code(), "name", "") in RETRYABLE_STATUS_NAMES
+        except Exception:
+            pass
+    message = str(error)
+    match = STATUS_IN_MESSAGE.search(message)
+    if match:
+        code = int(match.group(1) or match.group(2))
+        return code == 429 or code >= 500
+    message = message.lower()
+    return any(marker in message for marker in RETRYABLE_MARKERS)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at rate_per_minute.
+
+    The balance may go negative through debit(), which is used to charge
+    response tokens after the fact; callers then wait until it is repaid.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float, timeout: float) -> bool:
+        """Block until amount tokens are available and take them; False if that takes longer than timeout"""
+        amount = min(amount, self.capacity)
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return True
+                wait = (amount - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(min(wait, 1.0))
+
+    def debit(self, amount: float) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls for
+    reset_seconds. After that a single trial call is let through; its success
+    closes the circuit, its failure opens it again.
+
+    allow() tells a call whether it is that trial; the call passes the flag back
+    with its outcome, so only the trial itself can end the trial (a call started
+    before the circuit opened cannot let a second trial through).
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_seconds:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> Tuple[bool, bool]:
+        """(allowed, trial): whether a call may go ahead, and whether it is the half-open trial"""
+        with self._lock:
+            if self.opened_at is None:
+                return True, False
+            if time.monotonic() - self.opened_at < self.reset_seconds or self._trial_running:
+                return False, False
+            self._trial_running = True
+            return True, True
+
+    def record_success(self, trial: bool = False) -> None:
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info("Gemini circuit closed, API calls resumed")
+                record_circuit_open(False)
+            self.failures = 0
+            self.opened_at = None
+            if trial:
+                self._trial_running = False
+
+    def release(self, trial: bool = False) -> None:
+        """End a call without a verdict, e.g. when it never reached the API"""
+        if trial:
+            with self._lock:
+                self._trial_running = False
+
+    def record_failure(self, trial: bool = False) -> None:
+        with self._lock:
+            self.failures += 1
+            if trial or self.failures >= self.failure_threshold:
+                if self.opened_at is None or trial:
+                    logger.warning(f"Gemini circuit opened after {self.failures} consecutive failures, "
+                                   f"retrying in {self.reset_seconds:g}s")
+                self.opened_at = time.monotonic()
+                record_circuit_open(True)
+            if trial:
+                self._trial_running = False
+
+
+class LLMGateway:
+    """
+    Single entry point for outgoing Gemini calls.
+
+    Every attempt takes one request and the prompt's estimated tokens from
+    per-minute token buckets sized to the API quota, so bursts queue up
+    instead of turning into 429s. Retryable errors are retried with full-jitter
+    exponential backoff; repeated failures open a circuit breaker, during which
+    calls fail fast with LLMUnavailableError and callers use their local
+    fallbacks. Limits apply per process.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, max_retries: int,
+                 retry_base_delay: float, retry_max_delay: float, queue_timeout: float,
+                 breaker: CircuitBreaker):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.queue_timeout = queue_timeout
+        self.breaker = breaker
+
+    def available(self) -> bool:
+        """False while the circuit is open, so callers can skip work that needs Gemini"""
+        return self.breaker.state != "open"
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+
+    def call(self, prompt: str, call: Callable[[], str]) -> str:
+        """Run call() (one Gemini request for prompt) under the rate limits, retry policy and circuit breaker"""
+        prompt_tokens = estimate_tokens(prompt)
+        for attempt in range(self.max_retries + 1):
+            allowed, trial = self.breaker.allow()
+            if not allowed:
+                raise LLMUnavailableError("Gemini circuit is open")
+            if not (self.request_bucket.acquire(1, self.queue_timeout)
+                    and self.token_bucket.acquire(prompt_tokens, self.queue_timeout)):
+                # Not an API failure, so the breaker is left alone
+                self.breaker.release(trial)
+                raise LLMUnavailableError(f"Gemini quota wait exceeded {self.queue_timeout:g}s")
+
+            started = time.perf_counter()
+            try:
+                response = call()
+            except Exception as e:
+                record_llm_call("error", time.perf_counter() - started, prompt_tokens)
+                if not is_retryable(e):
+                    # Bad request or auth problem: retrying will not help. It says nothing about the
+                    # API's health, so the failure count is neither raised nor reset
+                    self.breaker.release(trial)
+                    raise
+                self.breaker.record_failure(trial)
+                if attempt == self.max_retries or not self.available():
+                    raise LLMUnavailableError(f"Gemini call failed after {attempt + 1} attempts: {e}") from e
+                delay = self._backoff(attempt)
+                logger.warning(f"Retryable Gemini error (attempt {attempt + 1}/{self.max_retries + 1}): {e}; "
+                               f"retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            self.breaker.record_success(trial)
+            response_tokens = estimate_tokens(response) if response else 0
+            record_llm_call("ok", time.perf_counter() - started, prompt_tokens, response_tokens)
+            if response_tokens:
+                self.token_bucket.debit(response_tokens)
+            return response
+
+    def stats(self) -> Dict:
+        return {
+            "circuit_state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures
+        }
+
+
+_llm_gateway = None
+_llm_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Process-wide gateway shared by the resume parser and the job matcher"""
+    global _llm_gateway
+    if _llm_gateway is None:
+        with _llm_gateway_lock:
+            if _llm_gateway is None:
+                _llm_gateway = LLMGateway(
+                    requests_per_minute=Config.LLM_REQUESTS_PER_MINUTE,
+                    tokens_per_minute=Config.LLM_TOKENS_PER_MINUTE,
+                    max_retries=Config.LLM_MAX_RETRIES,
+                    retry_base_delay=Config.LLM_RETRY_BASE_DELAY,
+                    retry_max_delay=Config.LLM_RETRY_MAX_DELAY,
+                    queue_timeout=Config.LLM_QUEUE_TIMEOUT_SECONDS,
+                    breaker=CircuitBreaker(Config.LLM_BREAKER_FAILURE_THRESHOLD, Config.LLM_BREAKER_RESET_SECONDS)
+                )
+    return _llm_gateway
+
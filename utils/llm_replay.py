@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import random
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class SimulatedLLMError(Exception):
+    """Injected by the replay backend; code 503 makes the LLM gateway treat it as retryable"""
+    code = 503
+
+
+def prompt_hash(model_name: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model_name}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+def _contents_text(contents) -> str:
+    """Prompt text of a genai generate_content() argument (a string or a list of role/parts messages)"""
+    if isinstance(contents, str):
+        return contents
+    parts = []
+    for message in contents:
+        if isinstance(message, dict):
+            parts.extend(str(part) for part in message.get("parts", []))
+        else:
+            parts.append(str(message))
+    return "\n".join(parts)
+
+
+class LLMRecorder:
+    """Appends one JSON line per Gemini call: model, prompt, response (or error) and latency"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def record(self, model_name: str, prompt: str, response: Optional[str], latency: float,
+               error: Optional[Exception] = None) -> None:
+        entry = {
+            "model": model_name,
+            "prompt_hash": prompt_hash(model_name, prompt),
+            "prompt": prompt,
+            "response": response,
+            "latency_ms": round(latency * 1000, 1),
+            "error": f"{type(error).__name__}: {error}" if error else None,
+            "recorded_at": datetime.now(timezone.utc).isoformat()
+        }
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as recording:
+                recording.write(line + "\n")
+
+    def timed(self, model_name: str, prompt: str, call):
+        """Run call(), record its outcome and return (or re-raise) it"""
+        started = time.perf_counter()
+        try:
+            response = call()
+        except Exception as e:
+            self.record(model_name, prompt, None, time.perf_counter() - started, error=e)
+            raise
+        self.record(model_name, prompt, response, time.perf_counter() - started)
+        return response
+
+
+class ReplayStore:
+    """
+    Recorded calls indexed by (model, prompt). Repeated prompts replay their
+    recordings in order, cycling once exhausted.
+    """
+
+    def __init__(self, path: str, latency_scale: float = 0.0, error_rate: float = 0.0):
+        self.path = path
+        self.latency_scale = latency_scale
+        self.error_rate = error_rate
+        self.misses = 0
+        self._entries: Dict[str, List[Dict]] = {}
+        self._cursors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as recording:
+                for line_number, line in enumerate(recording, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                        key = entry.get("prompt_hash") or prompt_hash(entry["model"], entry["prompt"])
+                    except (json.JSONDecodeError, KeyError) as e:
+                        logger.warning(f"Skipping malformed recording on line {line_number} of {path}: {e}")
+                        continue
+                    self._entries.setdefault(key, []).append(entry)
+        logger.info(f"Loaded {sum(len(entries) for entries in self._entries.values())} recorded LLM calls from {path}")
+
+    def respond(self, model_name: str, prompt: str) -> str:
+        """
+        Return the recorded response for this prompt after the (scaled) recorded
+        latency. Unknown prompts get an empty response, which callers already
+        treat as a failed call and handle with their fallbacks.
+        """
+        key = prompt_hash(model_name, prompt)
+        with self._lock:
+            entries = self._entries.get(key)
+            if entries:
+                cursor = self._cursors.get(key, 0)
+                entry = entries[cursor % len(entries)]
+                self._cursors[key] = cursor + 1
+            else:
+                entry = None
+                self.misses += 1
+
+        if entry is None:
+            logger.warning(f"No recording for {model_name} prompt {key[:12]}, replaying an empty response")
+            return ""
+        if self.latency_scale > 0:
+            time.sleep(entry.get("latency_ms", 0) / 1000 * self.latency_scale)
+        if self.error_rate > 0 and random.random() < self.error_rate:
+            raise SimulatedLLMError(f"503 Simulated Gemini failure for prompt {key[:12]}")
+        if entry.get("error"):
+            raise SimulatedLLMError(f"Recorded Gemini failure: {entry['error']}")
+        return entry.get("response") or ""
+
+
+class ReplayLLM:
+    """Stand-in for langchain's GoogleGenerativeAI: invoke(prompt) answers from a ReplayStore"""
+
+    def __init__(self, model_name: str, store: ReplayStore):
+        self.model_name = model_name
+        self.store = store
+
+    def invoke(self, prompt: str, **kwargs) -> str:
+        return self.store.respond(self.model_name, prompt)
+
+
+class ReplayResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class ReplayGenerativeModel:
+    """Stand-in for genai.GenerativeModel: generate_content() answers from a ReplayStore"""
+
+    def __init__(self, model_name: str, store: ReplayStore):
+        self.model_name = model_name
+        self.store = store
+
+    def generate_content(self, contents, **kwargs) -> ReplayResponse:
+        return ReplayResponse(self.store.respond(self.model_name, _contents_text(contents)))
+
+
+class RecordingLLM:
+    """Wraps a langchain LLM and records every invoke()"""
+
+    def __init__(self, llm, model_name: str, recorder: LLMRecorder):
+        self.llm = llm
+        self.model_name = model_name
+        self.recorder = recorder
+
+    def invoke(self, prompt: str, **kwargs) -> str:
+        return self.recorder.timed(self.model_name, prompt, lambda: self.llm.invoke(prompt, **kwargs))
+
+
+class RecordingGenerativeModel:
+    """Wraps a genai.GenerativeModel and records every generate_content()"""
+
+    def __init__(self, model, model_name: str, recorder: LLMRecorder):
+        self.model = model
+        self.model_name = model_name
+        self.recorder = recorder
+
+    def generate_content(self, contents, **kwargs) -> ReplayResponse:
+        text = self.recorder.timed(self.model_name, _contents_text(contents),
+                                   lambda: self.model.generate_content(contents, **kwargs).text)
+        return ReplayResponse(text)
+
+
+_recorder = None
+_replay_store = None
+_genai_configured = False
+_backend_lock = threading.Lock()
+
+
+def get_recorder() -> LLMRecorder:
+    global _recorder
+    with _backend_lock:
+        if _recorder is None:
+            _recorder = LLMRecorder(Config.LLM_RECORDINGS_PATH)
+            logger.info(f"Recording Gemini calls to {Config.LLM_RECORDINGS_PATH}")
+        return _recorder
+
+
+def get_replay_store() -> ReplayStore:
+    global _replay_store
+    with _backend_lock:
+        if _replay_store is None:
+            _replay_store = ReplayStore(
+                Config.LLM_RECORDINGS_PATH,
+                latency_scale=Config.LLM_REPLAY_LATENCY_SCALE,
+                error_rate=Config.LLM_REPLAY_ERROR_RATE
+            )
+        return _replay_store
+
+
+def make_langchain_llm(model_name: str, **kwargs):
+    """GoogleGenerativeAI for the configured LLM_BACKEND ('live', 'record' or 'replay')"""
+    if Config.LLM_BACKEND == "replay":
+        return ReplayLLM(model_name, get_replay_store())
+    from langchain_google_genai import GoogleGenerativeAI
+    llm = GoogleGenerativeAI(model=model_name, **kwargs)
+    if Config.LLM_BACKEND == "record":
+        return RecordingLLM(llm, model_name, get_recorder())
+    return llm
+
+
+def make_generative_model(model_name: str, generation_config: Optional[Dict] = None):
+    """genai.GenerativeModel for the configured LLM_BACKEND ('live', 'record' or 'replay')"""
+    if Config.LLM_BACKEND == "replay":
+        return ReplayGenerativeModel(model_name, get_replay_store())
+    global _genai_configured
+    import google.generativeai as genai
+    with _backend_lock:
+        if not _genai_configured and os.getenv("GEMINI_API_KEY"):
+            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        _genai_configured = True
+    model = genai.GenerativeModel(model_name, generation_config=generation_config)
+    if Config.LLM_BACKEND == "record":
+        return RecordingGenerativeModel(model, model_name, get_recorder())
+    return model
@@ -0,0 +1,235 @@
+import os
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Optional
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+logger = logging.getLogger(__name__)
+
+# With PROMETHEUS_MULTIPROC_DIR set (see gunicorn.conf.py) every worker process writes its samples
+# there and a scrape of any worker reports all of them; it must be set before prometheus_client is imported
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+ROW_BUCKETS = (0, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+STAGE_DURATION = Histogram(
+    "cvisionary_stage_duration_seconds", "Duration of each upload pipeline stage", ["stage"], buckets=DURATION_BUCKETS)
+REQUEST_DURATION = Histogram(
+    "cvisionary_request_duration_seconds", "End-to-end duration of resume processing requests", ["route"],
+    buckets=DURATION_BUCKETS)
+LLM_CALLS = Counter(
+    "cvisionary_llm_calls_total", "Gemini calls by pipeline stage and outcome", ["stage", "outcome"])
+LLM_LATENCY = Histogram(
+    "cvisionary_llm_call_duration_seconds", "Latency of Gemini API attempts", ["stage"], buckets=DURATION_BUCKETS)
+LLM_PROMPT_TOKENS = Histogram(
+    "cvisionary_llm_prompt_tokens", "Estimated prompt size of Gemini calls", ["stage"], buckets=TOKEN_BUCKETS)
+LLM_RESPONSE_TOKENS = Histogram(
+    "cvisionary_llm_response_tokens", "Estimated response size of Gemini calls", ["stage"], buckets=TOKEN_BUCKETS)
+FALLBACKS = Counter(
+    "cvisionary_fallbacks_total", "Results produced without a usable Gemini reply", ["stage", "reason"])
+RANKING_SKIPS = Counter(
+    "cvisionary_ranking_skipped_jobs_total", "Ranking candidates not sent to Gemini (dropped, or scored locally to fill the top-k)", ["reason"])
+DB_ROWS = Histogram(
+    "cvisionary_db_rows", "Rows returned by database queries", ["query"], buckets=ROW_BUCKETS)
+PDF_PAGE_DURATION = Histogram(
+    "cvisionary_pdf_page_duration_seconds", "Text extraction time of single PDF pages", buckets=DURATION_BUCKETS)
+CACHE_LOOKUPS = Counter(
+    "cvisionary_cache_lookups_total", "SQLite cache lookups by cache table and result", ["cache", "result"])
+# Gauges of per-process state, combined across workers as the multiprocess mode says
+PIPELINE_JOBS = Gauge(
+    "cvisionary_pipeline_jobs", "Upload pipeline jobs held by the queues, by state", ["state"],
+    multiprocess_mode="livesum")
+LLM_CIRCUIT_OPEN = Gauge(
+    "cvisionary_llm_circuit_open", "1 while a Gemini circuit breaker is open or half-open", multiprocess_mode="max")
+JOB_CATALOG_JOBS = Gauge(
+    "cvisionary_job_catalog_jobs", "Jobs held by the in-memory job catalog", multiprocess_mode="livemostrecent")
+
+
+class RequestMetrics:
+    """Stage durations and LLM usage of one request, accumulated across the threads that serve it"""
+
+    def __init__(self, route: str):
+        self.route = route
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.llm_calls = 0
+        self.cache_hits = 0
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_llm_call(self, prompt_tokens: int, response_tokens: int) -> None:
+        with self._lock:
+            self.llm_calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.response_tokens += response_tokens
+
+    def add_cache_hit(self) -> None:
+        with self._lock:
+            self.cache_hits += 1
+
+    def add_fallback(self) -> None:
+        with self._lock:
+            self.fallbacks += 1
+
+    def summary(self) -> str:
+        stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in self.stages.items())
+        return (f"{self.route} took {time.perf_counter() - self.started:.2f}s ({stages}); "
+                f"{self.llm_calls} Gemini calls, {self.cache_hits} cache hits, ~{self.prompt_tokens} prompt / ~{self.response_tokens} "
+                f"response tokens, {self.fallbacks} fallbacks")
+
+
+_current_stage = contextvars.ContextVar("metrics_stage", default="other")
+_current_request: contextvars.ContextVar = contextvars.ContextVar("metrics_request", default=None)
+
+
+def current_stage() -> str:
+    return _current_stage.get()
+
+
+def current_request() -> Optional[RequestMetrics]:
+    return _current_request.get()
+
+
+@contextmanager
+def timed_stage(stage: str):
+    """Time a pipeline stage; LLM calls made inside it are labelled with its name"""
+    token = _current_stage.set(stage)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _current_stage.reset(token)
+        STAGE_DURATION.labels(stage=stage).observe(elapsed)
+        request = current_request()
+        if request is not None:
+            request.add_stage(stage, elapsed)
+
+
+@contextmanager
+def track_request(route: str):
+    """Collect per-request metrics for the enclosed work and log a one-line breakdown at the end"""
+    request = RequestMetrics(route)
+    token = _current_request.set(request)
+    try:
+        yield request
+    finally:
+        _current_request.reset(token)
+        REQUEST_DURATION.labels(route=route).observe(time.perf_counter() - request.started)
+        logger.info(request.summary())
+
+
+def record_llm_call(outcome: str, seconds: float = 0.0, prompt_tokens: int = 0, response_tokens: int = 0) -> None:
+    """Count one Gemini call attempt (outcome: ok, error or cache_hit) and its size"""
+    stage = current_stage()
+    LLM_CALLS.labels(stage=stage, outcome=outcome).inc()
+    request = current_request()
+    if outcome == "cache_hit":
+        if request is not None:
+            request.add_cache_hit()
+        return
+    LLM_LATENCY.labels(stage=stage).observe(seconds)
+    LLM_PROMPT_TOKENS.labels(stage=stage).observe(prompt_tokens)
+    if outcome == "ok":
+        LLM_RESPONSE_TOKENS.labels(stage=stage).observe(response_tokens)
+    if request is not None:
+        request.add_llm_call(prompt_tokens, response_tokens)
+
+
+def record_fallback(reason: str) -> None:
+    FALLBACKS.labels(stage=current_stage(), reason=reason).inc()
+    request = current_request()
+    if request is not None:
+        request.add_fallback()
+
+
+def record_ranking_skip(reason: str, count: int = 1) -> None:
+    if count > 0:
+        RANKING_SKIPS.labels(reason=reason).inc(count)
+
+
+def record_db_rows(query: str, rows: int) -> None:
+    DB_ROWS.labels(query=query).observe(rows)
+
+
+def record_pdf_pages(page_seconds: Iterable[float]) -> None:
+    for seconds in page_seconds:
+        PDF_PAGE_DURATION.observe(seconds)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def record_pipeline_job_state(previous: Optional[str], state: Optional[str]) -> None:
+    """Move one upload job between states; None for a job being created or dropped"""
+    if previous:
+        PIPELINE_JOBS.labels(state=previous).dec()
+    if state:
+        PIPELINE_JOBS.labels(state=state).inc()
+
+
+def record_circuit_open(is_open: bool) -> None:
+    LLM_CIRCUIT_OPEN.set(1 if is_open else 0)
+
+
+def record_job_catalog_size(jobs: int) -> None:
+    JOB_CATALOG_JOBS.set(jobs)
+
+
+class _CallbackCollector(Collector):
+    """Gauge read from callback() at scrape time; None skips it"""
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], Optional[float]]):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+
+    def collect(self):
+        try:
+            value = self.callback()
+        except Exception as e:
+            logger.warning(f"Could not collect {self.name}: {e}")
+            return
+        if value is not None:
+            yield GaugeMetricFamily(self.name, self.help_text, value=value)
+
+
+_callbacks = []
+
+
+def register_callback(name: str, help_text: str, callback: Callable[[], Optional[float]]) -> None:
+    """
+    Report a gauge read at scrape time. Only for state every worker sees the same way
+    (e.g. the size of a SQLite file they share), since a scrape reaches one worker.
+    """
+    collector = _CallbackCollector(name, help_text, callback)
+    _callbacks.append(collector)
+    if not MULTIPROCESS:
+        REGISTRY.register(collector)
+
+
+def render_metrics() -> bytes:
+    """All metrics in the Prometheus text format: this process's, or every worker's in multiprocess mode"""
+    if not MULTIPROCESS:
+        return generate_latest(REGISTRY)
+    from prometheus_client import multiprocess
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    for collector in _callbacks:
+        registry.register(collector)
+    return generate_latest(registry)
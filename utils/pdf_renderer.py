@@ -0,0 +1,141 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional
+from config import Config
+from utils.cache import SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+
+def pdf_cache_key(data_fingerprint: str, template_version: str) -> str:
+    return hashlib.sha256(f"{template_version}:{data_fingerprint}".encode("utf-8")).hexdigest()
+
+
+def _write_pdf(html: str) -> bytes:
+    """Process pool task: lay out the HTML with WeasyPrint and return the PDF"""
+    from weasyprint import HTML # imported in the worker: loading WeasyPrint and its native libraries is slow
+    return HTML(string=html).write_pdf()
+
+
+def _copy_outcome(source: Future, target: Future) -> None:
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+class PdfRenderService:
+    """
+    Renders HTML to PDF in a process pool and caches the output by key.
+
+    Layout is CPU-heavy, so it runs in worker processes and a waiting web thread
+    only blocks on the result, for at most timeout seconds. A render already
+    in flight for a key (e.g. a pre-render started when the upload finished)
+    is shared instead of started again.
+    """
+
+    def __init__(self, cache: Optional[SQLiteCache], workers: int, timeout: float):
+        self.cache = cache
+        self.workers = workers
+        self.timeout = timeout
+        self._pool = None
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn, not fork: the web workers are multi-threaded, and forking them can deadlock
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def _start_write(self, html: str) -> Future:
+        with self._lock:
+            try:
+                return self._get_pool().submit(_write_pdf, html)
+            except (BrokenProcessPool, RuntimeError) as e:
+                logger.warning(f"PDF render pool unavailable ({e}), starting a new one")
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+                return self._get_pool().submit(_write_pdf, html)
+
+    def _submit(self, key: str, render_html: Callable[[], str]) -> Future:
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future
+            # Registered before the HTML is rendered, so concurrent requests for key wait on this render
+            future = Future()
+            self._in_flight[key] = future
+        future.add_done_callback(lambda done: self._finished(key, done))
+        # The template is rendered outside the lock: renders of other keys do not queue behind it
+        try:
+            write = self._start_write(render_html())
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        write.add_done_callback(lambda done: _copy_outcome(done, future))
+        return future
+
+    def _finished(self, key: str, future: Future) -> None:
+        with self._lock:
+            self._in_flight.pop(key, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            logger.warning(f"PDF render {key[:12]} failed: {error}")
+            if isinstance(error, BrokenProcessPool):
+                with self._lock:
+                    self._pool = None
+            return
+        if self.cache is not None:
+            self.cache.set(key, future.result())
+
+    def render(self, key: str, render_html: Callable[[], str]) -> bytes:
+        """
+        The PDF for key: from the cache, from a render already in flight, or
+        rendered now from render_html(). Raises TimeoutError after timeout seconds.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        future = self._submit(key, render_html)
+        return future.result(timeout=self.timeout)
+
+    def prerender(self, key: str, render_html: Callable[[], str]) -> None:
+        """Start rendering key in the background unless it is cached or already in flight"""
+        if self.cache is None or self.cache.get(key) is not None:
+            return
+        try:
+            self._submit(key, render_html)
+        except Exception as e:
+            logger.warning(f"Could not start PDF pre-render {key[:12]}: {e}")
+
+
+_pdf_renderer = None
+_pdf_renderer_lock = threading.Lock()
+
+
+def get_pdf_renderer() -> PdfRenderService:
+    """Process-wide PDF render service (its cache is shared by all workers on the host)"""
+    global _pdf_renderer
+    if _pdf_renderer is None:
+        with _pdf_renderer_lock:
+            if _pdf_renderer is None:
+                cache = None
+                if Config.PDF_CACHE_ENABLED:
+                    try:
+                        cache = SQLiteCache(Config.PDF_CACHE_PATH, table="resume_pdfs",
+                                            max_entries=Config.PDF_CACHE_MAX_ENTRIES, ttl_seconds=Config.PDF_CACHE_TTL_SECONDS)
+                    except sqlite3.Error as e:
+                        logger.error(f"Failed to open PDF cache at {Config.PDF_CACHE_PATH}: {e}")
+                _pdf_renderer = PdfRenderService(cache, Config.PDF_RENDER_WORKERS, Config.PDF_RENDER_TIMEOUT_SECONDS)
+    return _pdf_renderer
@@ -0,0 +1,170 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Tuple
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Rough Gemini tokenizer ratio for English text and JSON
+CHARS_PER_TOKEN = 4
+
+# Fields that never help the model score or summarize a resume or job
+RESUME_DROP_FIELDS = ("Email Address", "Phone Number", "LinkedIn Profile URL", "URL")
+JOB_DROP_FIELDS = ("url", "id", "created_at", "updated_at", "pre_score", "match_details")
+
+# Free-text fields, lowest value first: these are shortened, then dropped, to meet a budget
+RESUME_TRIM_FIELDS = ("Description", "Summary_or_Objective", "Technologies", "Soft Skills")
+JOB_TRIM_FIELDS = ("dis", "responsibilities", "general_requirements", "specific_requirements")
+
+# Text length limits tried in order for each trimmed field; 0 removes the field
+TRIM_STEPS = (400, 160, 60, 0)
+
+# Columns of the jobs table that hold JSON-encoded lists
+JOB_JSON_FIELDS = ("skills", "general_requirements", "specific_requirements", "dis", "responsibilities")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def budget_for(prompt_type: str) -> int:
+    """Token budget for the variable part (resume or job data) of a prompt type"""
+    return Config.PROMPT_TOKEN_BUDGETS.get(prompt_type, Config.PROMPT_TOKEN_BUDGETS["default"])
+
+
+def _is_empty(value) -> bool:
+    return value is None or (isinstance(value, (str, list, dict)) and not value)
+
+
+def prune(value, drop_fields: Iterable[str] = ()):
+    """Recursively remove empty values and the given keys"""
+    drop_fields = set(drop_fields)
+    if isinstance(value, dict):
+        pruned = {key: prune(item, drop_fields) for key, item in value.items() if key not in drop_fields}
+        return {key: item for key, item in pruned.items() if not _is_empty(item)}
+    if isinstance(value, list):
+        pruned = [prune(item, drop_fields) for item in value]
+        return [item for item in pruned if not _is_empty(item)]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def compact_json(value) -> str:
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def _shorten(value, limit: int):
+    """Cut text to limit characters; lists of strings are shortened as a whole"""
+    if isinstance(value, str):
+        return value if len(value) <= limit else value[:limit].rstrip() + "…"
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        kept, used = [], 0
+        for item in value:
+            if used + len(item) > limit:
+                break
+            kept.append(item)
+            used += len(item)
+        return kept
+    return value
+
+
+def _trim_field(value, field: str, limit: int):
+    """Apply a length limit to every occurrence of field, at any nesting depth"""
+    if isinstance(value, dict):
+        trimmed = {}
+        for key, item in value.items():
+            if key == field:
+                if limit == 0:
+                    continue
+                item = _shorten(item, limit)
+            else:
+                item = _trim_field(item, field, limit)
+            if not _is_empty(item):
+                trimmed[key] = item
+        return trimmed
+    if isinstance(value, list):
+        return [_trim_field(item, field, limit) for item in value]
+    return value
+
+
+def compile_record(record: Dict, budget_tokens: int, drop_fields: Iterable[str] = (),
+                   trim_fields: Iterable[str] = ()) -> str:
+    """
+    Serialize a record as compact JSON that fits budget_tokens where possible.
+
+    Empty values and drop_fields are removed first. If the result is still over
+    budget, each of trim_fields (lowest value first) is shortened step by step
+    and finally removed, stopping as soon as the record fits.
+    """
+    value = prune(record, drop_fields)
+    serialized = compact_json(value)
+    if estimate_tokens(serialized) <= budget_tokens:
+        return serialized
+
+    for field in trim_fields:
+        for limit in TRIM_STEPS:
+            value = _trim_field(value, field, limit)
+            serialized = compact_json(value)
+            if estimate_tokens(serialized) <= budget_tokens:
+                return serialized
+
+    logger.debug(f"Record still uses ~{estimate_tokens(serialized)} tokens after trimming (budget {budget_tokens})")
+    return serialized
+
+
+def compile_resume(resume_data: Dict, prompt_type: str = "resume") -> str:
+    return compile_record(resume_data, budget_for(prompt_type), RESUME_DROP_FIELDS, RESUME_TRIM_FIELDS)
+
+
+def _decode_job(job: Dict) -> Dict:
+    """Decode JSON-encoded list columns so they are not embedded as escaped strings"""
+    decoded = dict(job)
+    for field in JOB_JSON_FIELDS:
+        if isinstance(decoded.get(field), str):
+            try:
+                decoded[field] = json.loads(decoded[field])
+            except json.JSONDecodeError:
+                pass
+    return decoded
+
+
+_job_cache: "OrderedDict[Tuple, str]" = OrderedDict()
+_job_cache_lock = threading.Lock()
+JOB_CACHE_SIZE = 2048
+
+
+def compile_job(job: Dict, prompt_type: str = "job") -> str:
+    """
+    Compact, budgeted serialization of a job listing. Jobs with an id are
+    compiled once per (id, updated_at, budget) and reused across requests.
+    """
+    budget = budget_for(prompt_type)
+    cache_key = None
+    if job.get('id') is not None:
+        cache_key = (job['id'], str(job.get('updated_at')), budget)
+        with _job_cache_lock:
+            cached = _job_cache.get(cache_key)
+            if cached is not None:
+                _job_cache.move_to_end(cache_key)
+                return cached
+
+    serialized = compile_record(_decode_job(job), budget, JOB_DROP_FIELDS, JOB_TRIM_FIELDS)
+
+    if cache_key is not None:
+        with _job_cache_lock:
+            _job_cache[cache_key] = serialized
+            while len(_job_cache) > JOB_CACHE_SIZE:
+                _job_cache.popitem(last=False)
+    return serialized
+
+
+def fit_text(text: str, prompt_type: str) -> str:
+    """Cut plain text (e.g. extracted resume text) to the prompt type's budget"""
+    limit = budget_for(prompt_type) * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    logger.info(f"Truncating {prompt_type} prompt text from {len(text)} to {limit} characters")
+    return text[:limit]
@@ -0,0 +1,59 @@
+import json
+import zlib
+import sqlite3
+import logging
+import threading
+from typing import Dict, Optional
+from config import Config
+from utils.cache import SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+
+class ResultsStore:
+    """
+    Results of processed uploads (parsed resume, summary, ranked jobs,
+    recommendations) by result id, stored as zlib-compressed JSON in a SQLite
+    table. Entries expire after RESULTS_TTL_SECONDS; the session only holds the id.
+    """
+
+    def __init__(self, store: SQLiteCache):
+        self.store = store
+
+    def save(self, result_id: str, results: Dict) -> None:
+        payload = json.dumps(results, ensure_ascii=False, separators=(",", ":"), default=str)
+        self.store.set(result_id, zlib.compress(payload.encode("utf-8")))
+
+    def load(self, result_id: str) -> Optional[Dict]:
+        """The stored results, or None if the id is unknown or expired"""
+        value = self.store.get(result_id)
+        if value is None:
+            return None
+        try:
+            return json.loads(zlib.decompress(value).decode("utf-8"))
+        except (zlib.error, UnicodeDecodeError, ValueError) as e:
+            logger.warning(f"Dropping unreadable results {result_id}: {e}")
+            self.store.delete(result_id)
+            return None
+
+
+_results_store = None
+_results_store_lock = threading.Lock()
+
+
+def get_results_store() -> ResultsStore:
+    """Process-wide results store; the SQLite file is shared by all workers on the host"""
+    global _results_store
+    if _results_store is None:
+        with _results_store_lock:
+            if _results_store is None:
+                try:
+                    store = SQLiteCache(Config.RESULTS_STORE_PATH, table="upload_results",
+                                        max_entries=Config.RESULTS_MAX_ENTRIES, ttl_seconds=Config.RESULTS_TTL_SECONDS)
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to open results store at {Config.RESULTS_STORE_PATH}, "
+                                 f"using an in-memory store: {e}")
+                    store = SQLiteCache(":memory:", table="upload_results",
+                                        max_entries=Config.RESULTS_MAX_ENTRIES, ttl_seconds=Config.RESULTS_TTL_SECONDS)
+                _results_store = ResultsStore(store)
+    return _results_store